@@ -0,0 +1 @@
+"""Data and recommendation helpers shared by the Streamlit pages."""
@@ -0,0 +1,269 @@
+"""Offline benchmarks of the recommender's hot paths on synthetic catalogs.
+
+    python -m anime_recs.bench --sizes 17k 100k 1m --repeat 200 --baseline bench_baseline.json
+    python -m anime_recs.bench --sizes 17k 100k --save-baseline bench_baseline.json
+
+Inputs are generated once by anime_recs.synthetic into --data-dir and the
+catalog is loaded from those local files, so nothing is downloaded. Every
+size runs in its own forked process so its peak RSS is its own.
+
+Per case the report gives latency percentiles over `repeat` calls (inputs
+drawn outside the timed region) and the peak Python/NumPy allocation of
+one call, from tracemalloc in a separate, untimed pass. Against a saved
+baseline, a case regresses when its p50 or its peak memory grows by more
+than --tolerance; the exit status is then 1.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from anime_recs import engine
+from anime_recs.cards import CardRenderer
+from anime_recs.data import load_catalog
+from anime_recs.embeddings import build_item_embeddings
+from anime_recs.hybrid import fuse_hybrid
+from anime_recs.rec_cache import get_rec_cache
+from anime_recs.snapshot import CACHE_DIR
+from anime_recs.synthetic import write_synthetic_catalog
+
+BENCH_VERSION = 1
+DEFAULT_SIZES = ("17k", "100k")
+MEMORY_CALLS = 20
+WARMUP_CALLS = 10         # untimed, skipped for the one-shot cases (loads, embeddings)
+NOISE_FLOOR_MS = 0.05       # p50 changes below this are timer noise, never regressions
+ITEMS_PER_SLIDE = 5
+
+
+def parse_size(text):
+    text = str(text).lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def input_files(data_dir, n_items, log=print):
+    """Synthetic metadata CSV and co-occurrence JSON for n_items, generated on first use."""
+    meta_path = os.path.join(data_dir, f"catalog-{n_items}.csv")
+    recs_path = os.path.join(data_dir, f"user_recs-{n_items}.json")
+    if not (os.path.exists(meta_path) and os.path.exists(recs_path)):
+        os.makedirs(data_dir, exist_ok=True)
+        log(f"generating a synthetic catalog of {n_items:,} anime in {data_dir}")
+        write_synthetic_catalog(meta_path + ".tmp", recs_path + ".tmp", n_items)
+        os.replace(meta_path + ".tmp", meta_path)
+        os.replace(recs_path + ".tmp", recs_path)
+    return meta_path, recs_path
+
+
+# --- Measurement ---
+def summarize(samples_ns):
+    ms = np.asarray(samples_ns, dtype=np.float64) / 1e6
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"n": len(ms), "p50_ms": round(p50, 4), "p95_ms": round(p95, 4), "p99_ms": round(p99, 4),
+            "mean_ms": round(float(ms.mean()), 4)}
+
+
+def measure(setup, run, repeat, seed=0, memory_calls=MEMORY_CALLS):
+    """Time `run(*setup(rng))` `repeat` times, then take its peak allocation over a few more calls.
+
+    Both passes draw their inputs from their own seeded generator, so a
+    case sees the same inputs from run to run whatever the other cases do.
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(min(repeat, WARMUP_CALLS) if memory_calls > 1 else 0):
+        run(*setup(np.random.default_rng(seed + 2)))
+    samples = []
+    for _ in range(repeat):
+        args = setup(rng)
+        started = time.perf_counter_ns()
+        run(*args)
+        samples.append(time.perf_counter_ns() - started)
+    result = summarize(samples)
+
+    peak = 0
+    rng = np.random.default_rng(seed + 1)
+    tracemalloc.start()
+    for _ in range(min(repeat, memory_calls)):
+        args = setup(rng)
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        run(*args)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        del args
+    tracemalloc.stop()
+    result["peak_kib"] = round(peak / 1024, 1)
+    return result
+
+
+# --- Cases ---
+def bench_size(n_items, data_dir, repeat, load_repeat, seed=0, log=print):
+    """Results of every case for one catalog size: {case: summary}."""
+    meta_path, recs_path = input_files(data_dir, n_items, log)
+    results = {}
+    work = tempfile.mkdtemp(prefix="bench-", dir=data_dir)
+    try:
+        def fresh_cache():
+            cache_dir = tempfile.mkdtemp(dir=work)
+            return meta_path, recs_path, cache_dir
+
+        # Parsing and cleaning the CSV, converting the JSON graph, building the indexes
+        results["load_catalog_cold"] = measure(lambda r: fresh_cache(), load_catalog, load_repeat, seed, 1)
+        cache_dir = os.path.join(work, "warm")
+        catalog = load_catalog(meta_path, recs_path, cache_dir)
+        results["load_catalog_warm"] = measure(lambda r: (meta_path, recs_path, cache_dir), load_catalog,
+                                               load_repeat, seed, 1)
+        results["item_embeddings"] = measure(
+            lambda r: (catalog.user_recs, catalog.id_index, catalog.overlap_index), build_item_embeddings, 1, seed)
+        catalog.embeddings
+        log(f"  {n_items:,}: catalog and embeddings ready")
+
+        anime_ids = catalog.anime_df['anime_id'].to_numpy()
+        vocab = catalog.genre_index.vocab
+        all_rows = np.ones(len(anime_ids), dtype=bool)
+
+        def random_id(r):
+            return int(anime_ids[r.integers(len(anime_ids))])
+
+        def random_filter(r):
+            include = [vocab[i] for i in r.choice(len(vocab), r.integers(0, 3), replace=False)]
+            exclude = [vocab[i] for i in r.choice(len(vocab), r.integers(0, 2), replace=False) if vocab[i] not in include]
+            return include, exclude
+
+        def filtered(r):
+            anime_id = random_id(r)
+            return (catalog, anime_id, engine.filter_rows(catalog, *random_filter(r), preserve_anime_id=anime_id))
+
+        results["filter_rows"] = measure(lambda r: (catalog, *random_filter(r), random_id(r)),
+                                         engine.filter_rows, repeat, seed)
+        results["user_based_rows"] = measure(lambda r: (catalog, random_id(r), all_rows),
+                                             engine.user_based_rows, repeat, seed)
+        results["user_based_rows_filtered"] = measure(filtered, engine.user_based_rows, repeat, seed)
+
+        def genre_args(r):
+            catalog_, anime_id, allowed = filtered(r)
+            return catalog_, engine.seed_genres(catalog, anime_id), allowed, anime_id
+        results["genre_based_rows"] = measure(genre_args, engine.genre_based_rows, repeat, seed)
+
+        def hybrid_args(r):
+            user_ids, genre_ids = engine.get_cached_recs(catalog, random_id(r), [], [])
+            return user_ids, genre_ids, float(r.random())
+        results["fuse_hybrid"] = measure(hybrid_args, lambda u, g, w: fuse_hybrid(u, g, weight_user=w), repeat, seed)
+
+        def cold_recommend(r):
+            get_rec_cache().clear()
+            return catalog, random_id(r), *random_filter(r)
+        results["recommend_cold"] = measure(cold_recommend, engine.recommend, repeat, seed)
+
+        # A slide of one of the lists a session pages through (cached fragments), and of never-shown rows
+        shown = catalog.id_index.positions(anime_ids[:engine.MAX_RECOMMENDATIONS])
+
+        def slide_args(r):
+            return (shown[r.integers(len(shown), size=ITEMS_PER_SLIDE)],)
+        results["slide_html"] = measure(slide_args, catalog.cards.slide_html, repeat, seed)
+        results["slide_html_cold"] = measure(
+            lambda r: (CardRenderer(catalog.anime_df), r.integers(len(anime_ids), size=ITEMS_PER_SLIDE)),
+            lambda cards, positions: cards.slide_html(positions), repeat, seed)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    results["process"] = {"max_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    return results
+
+
+def run(sizes, data_dir, repeat=200, load_repeat=3, seed=0, log=print):
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    results = {}
+    for size in sizes:
+        n_items = parse_size(size)
+        log(f"benchmarking {n_items:,} anime")
+        with context.Pool(1) as pool:
+            results[str(n_items)] = pool.apply(bench_size, (n_items, data_dir, repeat, load_repeat, seed))
+    return {
+        "version": BENCH_VERSION,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+# --- Report ---
+def compare(report, baseline, tolerance):
+    """[(size, case, metric, baseline, current)] of every regression beyond `tolerance`."""
+    regressions = []
+    for size, cases in report["results"].items():
+        for case, current in cases.items():
+            before = baseline.get("results", {}).get(size, {}).get(case)
+            if not before or case == "process":
+                continue
+            if (current["p50_ms"] > before["p50_ms"] * (1 + tolerance)
+                    and current["p50_ms"] - before["p50_ms"] > NOISE_FLOOR_MS):
+                regressions.append((size, case, "p50_ms", before["p50_ms"], current["p50_ms"]))
+            if current["peak_kib"] > before["peak_kib"] * (1 + tolerance) + 64:
+                regressions.append((size, case, "peak_kib", before["peak_kib"], current["peak_kib"]))
+    return regressions
+
+
+def format_report(report, baseline=None):
+    lines = []
+    for size, cases in report["results"].items():
+        lines.append(f"\n{int(size):,} anime  (peak RSS {cases['process']['max_rss_mib']:,.0f} MiB)")
+        lines.append(f"  {'case':<26}{'n':>5}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'peak KiB':>11}{'vs base':>9}")
+        for case, r in cases.items():
+            if case == "process":
+                continue
+            before = (baseline or {}).get("results", {}).get(size, {}).get(case)
+            ratio = f"{r['p50_ms'] / before['p50_ms']:.2f}x" if before and before["p50_ms"] else "-"
+            lines.append(f"  {case:<26}{r['n']:>5}{r['p50_ms']:>11.3f}{r['p95_ms']:>11.3f}{r['p99_ms']:>11.3f}"
+                         f"{r['peak_kib']:>11,.0f}{ratio:>9}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the recommender on synthetic catalogs, offline.")
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), help="catalog sizes, e.g. 17k 100k 1m")
+    parser.add_argument("--repeat", type=int, default=200, help="timed calls per case")
+    parser.add_argument("--load-repeat", type=int, default=3, help="timed catalog loads per size")
+    parser.add_argument("--data-dir", default=os.path.join(CACHE_DIR, "bench"), help="where synthetic inputs are kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="compare against this saved report")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed growth before a case regresses (tighten on a quiet machine)")
+    parser.add_argument("--save-baseline", help="write this run's report here")
+    parser.add_argument("--json", help="also write this run's report here")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.data_dir, repeat=args.repeat, load_repeat=args.load_repeat, seed=args.seed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(format_report(report, baseline))
+    for path in (args.save_baseline, args.json):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    if baseline:
+        if baseline.get("repeat") != report["repeat"]:
+            print(f"note: the baseline used --repeat {baseline.get('repeat')}, percentiles may not be comparable")
+        regressions = compare(report, baseline, args.tolerance)
+        for size, case, metric, before, now in regressions:
+            print(f"REGRESSION {int(size):,} anime {case}: {metric} {before} -> {now}")
+        if regressions:
+            sys.exit(1)
+        print(f"\nno regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
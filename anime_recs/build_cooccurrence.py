@@ -0,0 +1,398 @@
+"""Offline builder for the user co-occurrence graph (user_recs_top100.json).
+
+    python -m anime_recs.build_cooccurrence rating.csv user_recs_top100.json \\
+        --min-rating 7 --top-k 100 --similarity count --workers 8
+
+Pipeline:
+
+1. Stream the ratings CSV in chunks, keep (user, anime) pairs with
+   rating >= --min-rating and spill them to flat binary files, so memory
+   does not depend on the size of the CSV.
+2. Split the pairs into buckets of whole users and build the binary
+   user x item matrix (CSR and CSC) one bucket at a time, stored as .npy
+   files that every worker memory-maps.
+3. Split the items into blocks; a process pool computes each block of
+   the item x item co-occurrence as one sparse product
+   ``U[:, block].T @ U``, normalises it, and keeps the top-K per item with
+   a partial selection. Only one dense block per worker is ever resident.
+4. Write the JSON artifact the app downloads (and optionally the CSR
+   graph file the app memory-maps).
+
+With --state-dir the builder also keeps the sufficient statistics (every
+user's liked set, per-anime like counts and the full pair-count matrix)
+so anime_recs.update_cooccurrence can later apply rating deltas without
+a full rebuild.
+
+Similarity (--similarity):
+    count   users who liked both (the original definition)
+    cosine  count / sqrt(n_a * n_b)
+    lift    count * n_users / (n_a * n_b)
+    pmi     log(lift)
+
+Needs scipy (see requirements-offline.txt); the app itself does not.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from anime_recs import recs_graph
+
+SIMILARITIES = ("count", "cosine", "lift", "pmi")
+CHUNK_ROWS = 2_000_000
+BLOCK_ITEMS = 256
+PAIRS_PER_BUCKET = 8_000_000     # liked pairs held in memory at once while building the matrix
+
+
+# --- Stage 1: stream ratings ---
+def spill_liked_pairs(ratings_path, work_dir, min_rating=7, chunksize=CHUNK_ROWS, log=print):
+    """Append (user_id, anime_id) of liked ratings to two int64 files; returns the pair count.
+
+    The anime ids seen (item_ids.npy) and the user id range (spill.json)
+    are recorded along the way for stage 2.
+    """
+    users_path = os.path.join(work_dir, "pairs_user.bin")
+    items_path = os.path.join(work_dir, "pairs_item.bin")
+    n_pairs = n_rows = 0
+    item_ids = np.empty(0, dtype=np.int64)
+    user_min, user_max = None, None
+    reader = pd.read_csv(ratings_path, usecols=["user_id", "anime_id", "rating"], chunksize=chunksize,
+                         dtype={"user_id": np.int64, "anime_id": np.int64, "rating": np.float32})
+    with open(users_path, "wb") as fu, open(items_path, "wb") as fi:
+        for chunk in reader:
+            liked = chunk[chunk["rating"] >= min_rating]
+            users = liked["user_id"].to_numpy(np.int64)
+            items = liked["anime_id"].to_numpy(np.int64)
+            fu.write(users.tobytes())
+            fi.write(items.tobytes())
+            if len(users):
+                item_ids = np.union1d(item_ids, items)
+                user_min = int(users.min()) if user_min is None else min(user_min, int(users.min()))
+                user_max = int(users.max()) if user_max is None else max(user_max, int(users.max()))
+            n_rows += len(chunk)
+            n_pairs += len(liked)
+            log(f"read {n_rows:,} ratings, {n_pairs:,} liked")
+    np.save(os.path.join(work_dir, "item_ids.npy"), item_ids)
+    with open(os.path.join(work_dir, "spill.json"), "w", encoding="utf-8") as f:
+        json.dump({"n_pairs": n_pairs, "user_min": user_min, "user_max": user_max}, f)
+    return n_pairs
+
+
+# --- Stage 2: user x item matrix ---
+def bucket_pairs(work_dir, n_buckets, user_min, user_max, chunk=CHUNK_ROWS):
+    """Split the spilled pairs into `n_buckets` files by user id range, so a bucket holds whole users."""
+    users_all = np.memmap(os.path.join(work_dir, "pairs_user.bin"), dtype=np.int64, mode="r")
+    items_all = np.memmap(os.path.join(work_dir, "pairs_item.bin"), dtype=np.int64, mode="r")
+    span = user_max - user_min + 1
+    files = [open(os.path.join(work_dir, f"bucket_{b}.bin"), "wb") for b in range(n_buckets)]
+    try:
+        for start in range(0, len(users_all), chunk):
+            users = np.asarray(users_all[start:start + chunk])
+            bucket = (users - user_min) * n_buckets // span
+            order = np.argsort(bucket, kind="stable")
+            bounds = np.searchsorted(bucket[order], np.arange(n_buckets + 1))
+            pairs = np.stack([users[order], np.asarray(items_all[start:start + chunk])[order]], axis=1)
+            for b in np.flatnonzero(np.diff(bounds)):
+                files[b].write(pairs[bounds[b]:bounds[b + 1]].tobytes())
+    finally:
+        for f in files:
+            f.close()
+
+
+def _new_npy(work_dir, name, length, dtype):
+    return np.lib.format.open_memmap(os.path.join(work_dir, f"{name}.npy"), mode="w+", dtype=dtype,
+                                     shape=(length,))
+
+
+def build_user_item(work_dir, pairs_per_bucket=PAIRS_PER_BUCKET):
+    """Binary user x item matrix from the spilled pairs, saved as CSR + CSC .npy arrays.
+
+    Only one bucket of users (about `pairs_per_bucket` pairs) is in memory
+    at a time: the CSR rows are appended bucket by bucket, users in
+    increasing id order, and the CSC is filled in place through a
+    memory-mapped file. Memory grows with the number of users and anime,
+    not with the number of ratings.
+    """
+    with open(os.path.join(work_dir, "spill.json"), encoding="utf-8") as f:
+        spill = json.load(f)
+    item_ids = np.load(os.path.join(work_dir, "item_ids.npy"))
+    n_items = len(item_ids)
+    n_buckets = -(-spill["n_pairs"] // pairs_per_bucket)
+    if n_buckets:
+        bucket_pairs(work_dir, n_buckets, spill["user_min"], spill["user_max"])
+
+    # CSR rows, one bucket at a time; np.unique both sorts and drops re-ratings
+    users, row_lengths = [], []
+    item_users = np.zeros(n_items, dtype=np.int64)
+    with open(os.path.join(work_dir, "csr_indices.bin"), "wb") as f:
+        for b in range(n_buckets):
+            pairs = np.fromfile(os.path.join(work_dir, f"bucket_{b}.bin"), dtype=np.int64).reshape(-1, 2)
+            keys = np.unique((pairs[:, 0] - spill["user_min"]) * n_items + np.searchsorted(item_ids, pairs[:, 1]))
+            del pairs
+            rows, cols = np.divmod(keys, n_items)
+            bucket_users, lengths = np.unique(rows, return_counts=True)
+            users.append(bucket_users + spill["user_min"])
+            row_lengths.append(lengths)
+            f.write(cols.astype(np.int32).tobytes())
+            item_users += np.bincount(cols, minlength=n_items)
+            os.remove(os.path.join(work_dir, f"bucket_{b}.bin"))
+    users = np.concatenate(users) if users else np.empty(0, dtype=np.int64)
+    lengths = np.concatenate(row_lengths) if row_lengths else np.empty(0, dtype=np.int64)
+    n_users, nnz = len(users), int(lengths.sum())
+    index_dtype = np.int32 if nnz < 2 ** 31 else np.int64     # scipy would copy mixed index dtypes
+
+    csr_indptr = np.zeros(n_users + 1, dtype=index_dtype)
+    np.cumsum(lengths, out=csr_indptr[1:])
+    csr_indices = _new_npy(work_dir, "csr_indices", nnz, index_dtype)
+    raw = np.memmap(os.path.join(work_dir, "csr_indices.bin"), dtype=np.int32, mode="r") if nnz else []
+    for start in range(0, nnz, CHUNK_ROWS):
+        csr_indices[start:start + CHUNK_ROWS] = raw[start:start + CHUNK_ROWS]
+    del raw
+    os.remove(os.path.join(work_dir, "csr_indices.bin"))
+
+    # CSC: each column's rows arrive in increasing order, bucket after bucket
+    csc_indptr = np.zeros(n_items + 1, dtype=index_dtype)
+    np.cumsum(item_users, out=csc_indptr[1:])
+    csc_indices = _new_npy(work_dir, "csc_indices", nnz, index_dtype)
+    cursor = csc_indptr[:-1].astype(np.int64)
+    row = 0
+    for bucket_lengths in row_lengths:
+        stop = row + len(bucket_lengths)
+        cols = np.asarray(csr_indices[csr_indptr[row]:csr_indptr[stop]])
+        rows = np.repeat(np.arange(row, stop, dtype=index_dtype), bucket_lengths)
+        order = np.argsort(cols, kind="stable")
+        cols = cols[order]
+        counts = np.bincount(cols, minlength=n_items)
+        first = np.cumsum(counts) - counts
+        csc_indices[cursor[cols] + np.arange(len(cols)) - first[cols]] = rows[order]
+        cursor += counts
+        row = stop
+    ones = _new_npy(work_dir, "ones", nnz, np.float32)
+    ones[:] = 1.0
+    for array in (csr_indices, csc_indices, ones):
+        array.flush()
+    del csr_indices, csc_indices, ones
+
+    np.save(os.path.join(work_dir, "users.npy"), users)
+    np.save(os.path.join(work_dir, "item_users.npy"), item_users)
+    np.save(os.path.join(work_dir, "csr_indptr.npy"), csr_indptr)
+    np.save(os.path.join(work_dir, "csc_indptr.npy"), csc_indptr)
+    return n_users, n_items
+
+
+# --- Stage 3: blocked co-occurrence (runs in worker processes) ---
+_worker = {}
+
+
+def _init_worker(work_dir, shape, similarity, top_k, min_count, keep_pairs=False):
+    import scipy.sparse as sp
+
+    def load(name):
+        return np.load(os.path.join(work_dir, f"{name}.npy"), mmap_mode="r")
+
+    ones = load("ones")
+    _worker.update(
+        csr=sp.csr_matrix((ones, load("csr_indices"), load("csr_indptr")), shape=shape),
+        csc=sp.csc_matrix((ones, load("csc_indices"), load("csc_indptr")), shape=shape),
+        item_users=np.asarray(load("item_users"), dtype=np.float64),
+        n_users=shape[0], similarity=similarity, top_k=top_k, min_count=min_count,
+        work_dir=work_dir, keep_pairs=keep_pairs,
+    )
+
+
+def normalise(counts, rows, item_users, n_users, similarity):
+    """Turn a dense block of raw co-counts (rows = item indices of the block) into similarities."""
+    if similarity == "count":
+        return counts
+    n_a = item_users[rows][:, None]
+    n_b = item_users[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if similarity == "cosine":
+            scores = counts / np.sqrt(n_a * n_b)
+        else:
+            scores = counts * n_users / (n_a * n_b)
+            if similarity == "pmi":
+                scores = np.log(scores)
+    return np.where(counts > 0, scores, -np.inf)
+
+
+def top_k_rows(scores, k):
+    """Column indices of the k best scores per row, best first (ties -> lower column)."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((len(scores), 0), dtype=np.int64)
+    kth = -np.partition(-scores, k - 1, axis=1)[:, k - 1:k]
+    above = scores > kth
+    tied = scores == kth
+    need = k - above.sum(axis=1, keepdims=True)
+    chosen = above | (tied & (np.cumsum(tied, axis=1) <= need))     # ties at the cut -> lower columns
+    part = np.nonzero(chosen)[1].reshape(len(scores), k)
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.lexsort((part, -part_scores), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+def _cooccurrence_block(bounds):
+    start, stop = bounds
+    w = _worker
+    import scipy.sparse as sp
+
+    pairs = w["csc"][:, start:stop].T.tocsr() @ w["csr"]                # (stop-start) x n_items
+    if w["keep_pairs"]:
+        sp.save_npz(os.path.join(w["work_dir"], f"pairs_{start}.npz"), pairs, compressed=False)
+    block = pairs.toarray()
+    rows = np.arange(start, stop)
+    block[np.arange(len(rows)), rows] = 0                               # an anime is not its own neighbour
+    counts = block
+    scores = normalise(counts, rows, w["item_users"], w["n_users"], w["similarity"])
+    scores = np.where(counts >= w["min_count"], scores, -np.inf)
+    best = top_k_rows(scores, w["top_k"])
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    return start, best, best_scores.astype(np.float32)
+
+
+def build_graph(work_dir, shape, similarity="count", top_k=100, min_count=1, workers=None,
+                block_items=BLOCK_ITEMS, keep_pairs=False, log=print):
+    """Top-K neighbours for every item as {anime_id: ids}, {anime_id: scores}."""
+    item_ids = np.load(os.path.join(work_dir, "item_ids.npy"))
+    blocks = [(s, min(s + block_items, shape[1])) for s in range(0, shape[1], block_items)]
+    neighbours, weights = {}, {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(work_dir, shape, similarity, top_k, min_count, keep_pairs)) as pool:
+        for done, (start, best, best_scores) in enumerate(pool.map(_cooccurrence_block, blocks), start=1):
+            for offset, (cols, row_scores) in enumerate(zip(best, best_scores)):
+                keep = np.isfinite(row_scores)
+                if keep.any():
+                    anime_id = int(item_ids[start + offset])
+                    neighbours[anime_id] = item_ids[cols[keep]].tolist()
+                    weights[anime_id] = row_scores[keep].tolist()
+            log(f"co-occurrence blocks {done}/{len(blocks)}")
+    return neighbours, weights
+
+
+# --- Stage 4: artifacts ---
+def write_json(neighbours, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({str(k): v for k, v in neighbours.items()}, f)
+    os.replace(tmp, path)
+
+
+def save_state(work_dir, state_dir, shape, graph, params, block_items=BLOCK_ITEMS):
+    """Persist the sufficient statistics for incremental updates, indexed by anime_id.
+
+    users.npy / user_indptr.npy / user_items.npy   liked anime_ids per user (CSR, users sorted)
+    item_users.npy                                 users who liked each anime_id
+    pairs_indptr.npy / pairs_indices.npy / pairs_data.npy
+                                                   item x item co-counts (CSR, diagonal = item_users)
+    graph.csr                                      the current top-K graph, with weights
+    meta.json                                      build parameters and n_users
+    """
+    import scipy.sparse as sp
+
+    item_ids = np.load(os.path.join(work_dir, "item_ids.npy"))
+    size = int(item_ids.max()) + 1 if len(item_ids) else 0
+    os.makedirs(state_dir, exist_ok=True)
+
+    shutil.copyfile(os.path.join(work_dir, "users.npy"), os.path.join(state_dir, "users.npy"))
+    indptr = np.load(os.path.join(work_dir, "csr_indptr.npy"))
+    np.save(os.path.join(state_dir, "user_indptr.npy"), indptr.astype(np.int64))
+    indices = np.load(os.path.join(work_dir, "csr_indices.npy"), mmap_mode="r")
+    user_items = _new_npy(state_dir, "user_items", len(indices), np.int32)
+    for start in range(0, len(indices), CHUNK_ROWS):
+        user_items[start:start + CHUNK_ROWS] = item_ids[indices[start:start + CHUNK_ROWS]]
+    user_items.flush()
+    del user_items
+
+    item_users = np.zeros(size, dtype=np.int64)
+    item_users[item_ids] = np.load(os.path.join(work_dir, "item_users.npy"))
+    np.save(os.path.join(state_dir, "item_users.npy"), item_users)
+
+    # The blocks are consecutive rows and item_ids is sorted, so they are copied out in order
+    paths = [os.path.join(work_dir, f"pairs_{start}.npz") for start in range(0, shape[1], block_items)]
+    lengths = np.zeros(size, dtype=np.int64)
+    for start, path in zip(range(0, shape[1], block_items), paths):
+        block_indptr = sp.load_npz(path).indptr
+        lengths[item_ids[start:start + len(block_indptr) - 1]] = np.diff(block_indptr)
+    pairs_indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(lengths, out=pairs_indptr[1:])
+    np.save(os.path.join(state_dir, "pairs_indptr.npy"), pairs_indptr)
+    pairs_indices = _new_npy(state_dir, "pairs_indices", int(pairs_indptr[-1]), np.int32)
+    pairs_data = _new_npy(state_dir, "pairs_data", int(pairs_indptr[-1]), np.int32)
+    pos = 0
+    for path in paths:
+        block = sp.load_npz(path)
+        block.sort_indices()
+        pairs_indices[pos:pos + block.nnz] = item_ids[block.indices]
+        pairs_data[pos:pos + block.nnz] = block.data.astype(np.int32)
+        pos += block.nnz
+    pairs_indices.flush()
+    pairs_data.flush()
+    del pairs_indices, pairs_data
+
+    recs_graph.save(graph, os.path.join(state_dir, "graph.csr"))
+    with open(os.path.join(state_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(dict(params, n_users=int(shape[0])), f)
+
+
+def build(ratings_path, out_path, csr_path=None, min_rating=7, top_k=100, similarity="count",
+          min_count=1, workers=None, chunksize=CHUNK_ROWS, block_items=BLOCK_ITEMS, work_dir=None,
+          state_dir=None, pairs_per_bucket=PAIRS_PER_BUCKET, log=print):
+    if similarity not in SIMILARITIES:
+        raise ValueError(f"similarity must be one of {', '.join(SIMILARITIES)}")
+    started = time.perf_counter()
+    tmp_dir = tempfile.mkdtemp(prefix="cooc-", dir=work_dir)
+    try:
+        spill_liked_pairs(ratings_path, tmp_dir, min_rating=min_rating, chunksize=chunksize, log=log)
+        shape = build_user_item(tmp_dir, pairs_per_bucket=pairs_per_bucket)
+        log(f"user x item matrix: {shape[0]:,} users x {shape[1]:,} anime")
+        neighbours, weights = build_graph(tmp_dir, shape, similarity=similarity, top_k=top_k,
+                                          min_count=min_count, workers=workers, block_items=block_items,
+                                          keep_pairs=state_dir is not None, log=log)
+        graph = recs_graph.from_lists(neighbours, weights)
+        if state_dir:
+            params = dict(min_rating=min_rating, top_k=top_k, similarity=similarity, min_count=min_count)
+            save_state(tmp_dir, state_dir, shape, graph, params, block_items=block_items)
+            log(f"saved incremental state to {state_dir}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    write_json(neighbours, out_path)
+    if csr_path:
+        recs_graph.save(graph, csr_path)
+    log(f"wrote {len(neighbours):,} anime to {out_path} in {time.perf_counter() - started:.1f}s")
+    return neighbours, weights
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build user_recs_top100.json from user ratings.")
+    parser.add_argument("ratings_path", help="CSV with user_id, anime_id, rating columns")
+    parser.add_argument("out_path", help="JSON artifact consumed by the app")
+    parser.add_argument("--csr", dest="csr_path", help="also write the memory-mappable CSR graph here")
+    parser.add_argument("--min-rating", type=float, default=7)
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--similarity", choices=SIMILARITIES, default="count")
+    parser.add_argument("--min-count", type=int, default=1, help="minimum users who liked both")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--block-items", type=int, default=BLOCK_ITEMS)
+    parser.add_argument("--pairs-per-bucket", type=int, default=PAIRS_PER_BUCKET,
+                        help="liked ratings held in memory at once while building the matrix")
+    parser.add_argument("--work-dir", default=None, help="where to put the temporary matrix files")
+    parser.add_argument("--state-dir", default=None, help="keep pair counts here for incremental updates")
+    args = parser.parse_args(argv)
+
+    build(args.ratings_path, args.out_path, csr_path=args.csr_path, min_rating=args.min_rating,
+          top_k=args.top_k, similarity=args.similarity, min_count=args.min_count, workers=args.workers,
+          chunksize=args.chunksize, block_items=args.block_items, work_dir=args.work_dir,
+          state_dir=args.state_dir, pairs_per_bucket=args.pairs_per_bucket)
+
+
+if __name__ == "__main__":
+    main()
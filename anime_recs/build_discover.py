@@ -0,0 +1,205 @@
+"""Offline builder for discover.json and the per-anime rating stats table.
+
+    python -m anime_recs.build_discover rating.csv cleaned_anime_metadata_filtered.csv discover.json \\
+        --stats anime_stats.csv --workers 8
+
+One streaming pass over the ratings CSV keeps, per anime, the number of
+ratings, their mean and M2 (sum of squared deviations from the mean).
+The file is split into byte ranges, one per worker; each worker parses its
+range in chunks and folds every chunk into its running moments, and the
+partial moments are merged with Chan's parallel update. Memory depends on
+the number of anime and the chunk size, never on the number of ratings.
+
+Outputs:
+    anime_stats.csv   anime_id, rating_count, mean_rating, std_rating (sample std)
+    discover.json     hidden_gems       score >= 8.0 and fewer than 5,000 ratings
+                      polarizing_anime  std_rating >= 2.0 with at least 100 ratings
+
+`score` is the catalog (MyAnimeList) score from the metadata file; ratings
+<= 0 mean "watched, not scored" and are skipped.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from anime_recs.data import clean_metadata
+
+GEM_MIN_SCORE = 8.0
+GEM_MAX_RATINGS = 5000
+POLAR_MIN_STD = 2.0
+POLAR_MIN_RATINGS = 100
+TOP_N = 50
+CHUNK_ROWS = 2_000_000
+CARD_FIELDS = ['anime_id', 'title', 'score', 'image_url', 'genres', 'mal_url', 'type', 'year', 'episodes', 'sequel']
+
+
+# --- Moments ---
+def chunk_moments(anime_ids, ratings):
+    """(count, mean, m2) per anime_id for one chunk, two-pass so the chunk's M2 is exact."""
+    size = int(anime_ids.max()) + 1 if len(anime_ids) else 0
+    count = np.bincount(anime_ids, minlength=size)
+    total = np.bincount(anime_ids, weights=ratings, minlength=size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(count > 0, total / count, 0.0)
+    m2 = np.bincount(anime_ids, weights=(ratings - mean[anime_ids]) ** 2, minlength=size)
+    return count, mean, m2
+
+
+def merge_moments(a, b):
+    """Combine two (count, mean, m2) triples (Chan et al.); either side may be shorter."""
+    size = max(len(a[0]), len(b[0]))
+    (na, ma, m2a), (nb, mb, m2b) = ([np.pad(x, (0, size - len(x))) for x in m] for m in (a, b))
+    n = na + nb
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = mb - ma
+        mean = np.where(n > 0, ma + delta * nb / n, 0.0)
+        m2 = np.where(n > 0, m2a + m2b + delta ** 2 * na * nb / n, 0.0)
+    return n, mean, m2
+
+
+def empty_moments():
+    return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+
+# --- Parallel pass over byte ranges ---
+class _ByteRange:
+    """Read-only file view that stops at `stop`, so read_csv can stream one range."""
+
+    def __init__(self, path, start, stop):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._left = stop - start
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self._left:
+            size = self._left
+        data = self._file.read(size)
+        self._left -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def split_ranges(path, parts):
+    """Byte ranges of whole lines after the header, roughly equal in size."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        bounds = [f.tell()]
+        for i in range(1, parts):
+            f.seek(max(bounds[-1], size * i // parts))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    names = header.decode("utf-8").strip().split(",")
+    return names, [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+
+def range_moments(path, names, start, stop, chunksize=CHUNK_ROWS):
+    source = _ByteRange(path, start, stop)
+    moments = empty_moments()
+    try:
+        reader = pd.read_csv(source, names=names, header=None, usecols=["anime_id", "rating"],
+                             dtype={"anime_id": np.int64, "rating": np.float64}, chunksize=chunksize)
+        for chunk in reader:
+            chunk = chunk[chunk["rating"] > 0]
+            moments = merge_moments(moments, chunk_moments(chunk["anime_id"].to_numpy(),
+                                                           chunk["rating"].to_numpy()))
+    finally:
+        source.close()
+    return moments
+
+
+def rating_moments(ratings_path, workers=None, chunksize=CHUNK_ROWS, log=print):
+    workers = workers or os.cpu_count() or 1
+    names, ranges = split_ranges(ratings_path, workers)
+    moments = empty_moments()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(range_moments, ratings_path, names, start, stop, chunksize)
+                   for start, stop in ranges]
+        for done, future in enumerate(futures, start=1):
+            moments = merge_moments(moments, future.result())
+            log(f"ratings ranges {done}/{len(ranges)}")
+    return moments
+
+
+# --- Outputs ---
+def stats_table(moments):
+    count, mean, m2 = moments
+    ids = np.flatnonzero(count)
+    n = count[ids]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = np.where(n > 1, np.sqrt(m2[ids] / np.maximum(n - 1, 1)), 0.0)
+    return pd.DataFrame({
+        "anime_id": ids.astype(np.int64),
+        "rating_count": n.astype(np.int64),
+        "mean_rating": mean[ids].round(4),
+        "std_rating": std.round(4),
+    })
+
+
+def _cards(frame, extra):
+    cards = []
+    frame = frame.assign(image_url=frame["image_url"].fillna(""))
+    for row in frame[CARD_FIELDS + extra].to_dict("records"):
+        row["anime_id"] = int(row["anime_id"])
+        row["score"] = None if pd.isna(row["score"]) else float(row["score"])
+        row["year"] = int(row["year"]) if row["year"] else "N/A"
+        row["episodes"] = "N/A" if pd.isna(row["episodes"]) else str(row["episodes"])
+        row["rating_count"] = int(row["rating_count"])
+        cards.append(row)
+    return cards
+
+
+def discover_lists(stats, metadata, top_n=TOP_N):
+    meta = metadata.drop_duplicates("anime_id").assign(year=metadata["year_display"])
+    merged = stats.merge(meta, on="anime_id", how="inner")
+    gems = merged[(merged["score"] >= GEM_MIN_SCORE) & (merged["rating_count"] < GEM_MAX_RATINGS)]
+    gems = gems.sort_values(["score", "rating_count", "anime_id"], ascending=[False, False, True])
+    polar = merged[(merged["std_rating"] >= POLAR_MIN_STD) & (merged["rating_count"] >= POLAR_MIN_RATINGS)]
+    polar = polar.sort_values(["std_rating", "anime_id"], ascending=[False, True])
+    return {
+        "hidden_gems": _cards(gems.head(top_n), ["rating_count", "mean_rating"]),
+        "polarizing_anime": _cards(polar.head(top_n), ["rating_count", "mean_rating", "std_rating"]),
+    }
+
+
+def build(ratings_path, metadata_path, out_path, stats_path=None, workers=None, chunksize=CHUNK_ROWS,
+          top_n=TOP_N, log=print):
+    started = time.perf_counter()
+    stats = stats_table(rating_moments(ratings_path, workers=workers, chunksize=chunksize, log=log))
+    if stats_path:
+        stats.to_csv(stats_path, index=False)
+    discover = discover_lists(stats, clean_metadata(metadata_path), top_n=top_n)
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(discover, f)
+    os.replace(tmp, out_path)
+    log(f"{len(stats):,} anime rated; {len(discover['hidden_gems'])} hidden gems, "
+        f"{len(discover['polarizing_anime'])} polarizing, in {time.perf_counter() - started:.1f}s")
+    return stats, discover
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build discover.json and per-anime rating stats.")
+    parser.add_argument("ratings_path", help="CSV with user_id, anime_id, rating columns")
+    parser.add_argument("metadata_path", help="anime metadata CSV (as published for the app)")
+    parser.add_argument("out_path", help="discover.json consumed by the Wildcards page")
+    parser.add_argument("--stats", dest="stats_path", help="also write the per-anime stats table here")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--top", dest="top_n", type=int, default=TOP_N, help="entries per list")
+    args = parser.parse_args(argv)
+
+    build(args.ratings_path, args.metadata_path, args.out_path, stats_path=args.stats_path,
+          workers=args.workers, chunksize=args.chunksize, top_n=args.top_n)
+
+
+if __name__ == "__main__":
+    main()
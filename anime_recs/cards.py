@@ -0,0 +1,108 @@
+"""HTML for the recommendation cards, shared by the recommender and Wildcards pages.
+
+A card is split into its per-anime fragments (link, image, title, genre
+tags, meta lines, default score line), escaped once, and the parts that
+change per slide: the card number and any page-specific extra lines.
+CardRenderer keeps the fragments of every catalog row it has rendered, so
+a slide is a join of cached strings. The cards' look is in
+static/anime_recs.css, which pages pull in with stylesheet_html().
+"""
+import html
+import math
+
+PLACEHOLDER_IMAGE = "https://via.placeholder.com/160x200?text=No+Image"
+# Served from static/ next to Animerecommender.py (server.enableStaticServing in .streamlit/config.toml)
+STYLESHEET_URL = "app/static/anime_recs.css"
+SEQUEL_CHARS = 20
+CARD_END = "</div></a>"
+
+
+def stylesheet_html(url=STYLESHEET_URL):
+    """A <style> that only imports the shared stylesheet, which the browser fetches once and caches."""
+    return f'<style>@import url("{url}");</style>'
+
+
+def _text(value, missing="N/A"):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return missing
+    return html.escape(str(value))
+
+
+def format_genres_as_tags(genres_list):
+    if not isinstance(genres_list, list): return "N/A"
+    tags = [f'<span class="genre-tag">{html.escape(str(g).strip())}</span>' for g in genres_list[:5]]
+    return " ".join(tags) if tags else "N/A"
+
+
+def score_html(score):
+    return f'<div class="score">Score: {_text(score)}</div>'
+
+
+def meta_html(text):
+    """One extra grey line on a card, e.g. the rating count or σ on the Wildcards page."""
+    return f'<div class="meta-info">{text}</div>'
+
+
+def card_parts(row):
+    """(opening, body, score line) of one card; `row` is any mapping with the card fields."""
+    mal_url = _text(row.get('mal_url') or '#')
+    image_url = row.get('image_url')
+    image_url = html.escape(image_url) if isinstance(image_url, str) and image_url else PLACEHOLDER_IMAGE
+    sequel = str(row.get('sequel', 'N/A'))
+    if len(sequel) > SEQUEL_CHARS:
+        sequel = sequel[:SEQUEL_CHARS] + "..."
+
+    opening = (f'<a href="{mal_url}" target="_blank" rel="noopener noreferrer">'
+               f'<div class="anime-card"><div class="card-number">')
+    body = (
+        f'</div><img src="{image_url}" onerror="this.src=&quot;{PLACEHOLDER_IMAGE}&quot;">'
+        f'<h4>{_text(row.get("title"), "Unknown")}</h4>'
+        f'<div>{format_genres_as_tags(row.get("genres", []))}</div>'
+        + meta_html(f'Type: {_text(row.get("type"))}')
+        + meta_html(f'Year: {_text(row.get("year"))}')
+        + meta_html(f'Episodes: {_text(row.get("episodes"))}')
+        + meta_html(f'Sequel: {html.escape(sequel)}')
+    )
+    return opening, body, score_html(row.get('score'))
+
+
+def card_html(parts, number, extra="", score=None):
+    """One numbered .anime-card from card_parts(); `score` replaces the row's own score line."""
+    opening, body, default_score = parts
+    return f'{opening}{number}{body}{extra}{default_score if score is None else score_html(score)}{CARD_END}'
+
+
+def slide_html(cards):
+    return f'<div class="slide-container">{"".join(cards)}</div>'
+
+
+class CardRenderer:
+    """Card fragments of one catalog's rows, rendered on first use and kept for the catalog's lifetime."""
+
+    COLUMNS = ('title', 'score', 'image_url', 'genres', 'mal_url', 'type', 'year_display', 'episodes', 'sequel')
+
+    def __init__(self, anime_df):
+        self._columns = {col: anime_df[col].to_numpy() for col in self.COLUMNS}
+        self._parts = [None] * len(anime_df)
+
+    def parts(self, position):
+        parts = self._parts[position]
+        if parts is None:
+            row = {col: values[position] for col, values in self._columns.items()}
+            row['year'] = row.pop('year_display') or 'N/A'
+            # A race only renders the same strings twice
+            parts = self._parts[position] = card_parts(row)
+        return parts
+
+    def slide_html(self, positions, start=1, extras=None, scores=None):
+        """A .slide-container with one card per catalog position, numbered from `start`.
+
+        `extras` (HTML) and `scores` are optional per-card lists aligned
+        with `positions`.
+        """
+        positions = list(positions)
+        extras = extras or [""] * len(positions)
+        scores = scores or [None] * len(positions)
+        return slide_html(card_html(self.parts(pos), number, extra, score)
+                          for number, pos, extra, score in zip(range(start, start + len(positions)),
+                                                               positions, extras, scores))
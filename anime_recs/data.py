@@ -0,0 +1,239 @@
+"""Shared data layer: downloads, cleans, types and caches every artifact once per process.
+
+All pages import from here instead of parsing the files themselves, so a
+server process holds a single copy of the catalog. The frame and the
+index arrays are shared between sessions and must be treated as
+read-only: the index arrays are flagged non-writeable, but the frame is
+not protected (copy-on-write is only the default from pandas 3), so a
+page that edits it must .copy() first, as the Data Explorer does.
+
+Artifacts come from the Hugging Face dataset unless ANIME_RECS_DATA_DIR
+names a local directory holding the same files; huggingface_hub is then
+never imported. From the Hub, the first artifact a page asks for fetches
+all of them at once, so their downloads (or cache revalidations) overlap
+instead of running one after another on every page.
+"""
+import ast
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property
+
+import pandas as pd
+
+from anime_recs.cards import CardRenderer
+from anime_recs.discover import build_discover_table, read_anime_stats
+from anime_recs.embeddings import load_or_build as load_or_build_embeddings
+from anime_recs.genre_index import GenreIndex, build_genre_index
+from anime_recs.id_index import IdIndex, build_id_index
+from anime_recs.recs_graph import CooccurrenceGraph, load_or_convert
+from anime_recs.snapshot import CACHE_DIR, file_digest, load_snapshot
+from anime_recs.title_search import TitleSearchIndex
+
+# --- Hugging Face Dataset ---
+HF_REPO_ID = "nigenghanei-a11y/Anime_recommender"
+HF_REPO_TYPE = "dataset"
+METADATA_FILE = "cleaned_anime_metadata_filtered.csv"
+USER_RECS_FILE = "user_recs_top100.json"
+DISCOVER_FILE = "discover.json"
+ANIME_STATS_FILE = "anime_stats.csv"     # optional: the published dataset may not have it
+ARTIFACTS = (METADATA_FILE, USER_RECS_FILE, DISCOVER_FILE, ANIME_STATS_FILE)
+DATA_DIR = os.environ.get("ANIME_RECS_DATA_DIR")   # offline mode: read every artifact from here
+
+REQUIRED_COLUMNS = ['title', 'genres', 'score', 'image_url', 'anime_id', 'genres_detailed',
+                    'type', 'year', 'episodes', 'mal_url', 'sequel']
+
+
+@dataclass(frozen=True)
+class Catalog:
+    anime_df: pd.DataFrame      # RangeIndex: row label == catalog position
+    user_recs: CooccurrenceGraph  # anime_id -> ranked neighbour anime_ids (memory-mapped CSR)
+    genre_index: GenreIndex     # bitmasks over `genres`
+    overlap_index: GenreIndex   # bitmasks over `genres` + `genres_detailed`
+    id_index: IdIndex
+    cache_dir: str = CACHE_DIR  # snapshots, the binary graph and the embeddings live here
+
+    @cached_property
+    def title_search(self):
+        # Built on first use: only the recommender page needs it
+        df = self.anime_df
+        return TitleSearchIndex(df['anime_id'], df['title'], df['alternative_title'], df['score'])
+
+    @cached_property
+    def cards(self):
+        # Escaped card HTML per row, filled in as rows are first shown and shared by every page
+        return CardRenderer(self.anime_df)
+
+    def start_embeddings(self):
+        """Future of the item embeddings; the first call starts building them (or reading the cache dir)."""
+        with _lock:
+            future = self.__dict__.get('_embeddings')
+            if future is None:
+                future = self.__dict__['_embeddings'] = _background.submit(
+                    lambda: _read_only(load_or_build_embeddings(self.user_recs, self.id_index,
+                                                                self.overlap_index, self.cache_dir)))
+        return future
+
+    @property
+    def embeddings(self):
+        # Waits for the build; pages pad through ready_embeddings() so a rerun never does
+        return self.start_embeddings().result()
+
+    def ready_embeddings(self):
+        """The item embeddings if they are built, else None (the build is started if it was not)."""
+        future = self.start_embeddings()
+        return future.result() if future.done() else None
+
+
+# --- Artifacts ---
+def download(filename):
+    # Imported here: offline mode never needs huggingface_hub and its HTTP stack
+    from huggingface_hub import hf_hub_download
+    return hf_hub_download(repo_id=HF_REPO_ID, filename=filename, repo_type=HF_REPO_TYPE)
+
+
+def fetch_artifacts(filenames=ARTIFACTS):
+    """{filename: local path, or the exception its download raised}, downloaded concurrently."""
+    with ThreadPoolExecutor(max_workers=len(filenames), thread_name_prefix="hf-download") as pool:
+        futures = {filename: pool.submit(download, filename) for filename in filenames}
+    return {filename: future.exception() or future.result() for filename, future in futures.items()}
+
+
+def artifact_path(filename):
+    """Local path of one artifact, from DATA_DIR in offline mode and from the Hub otherwise."""
+    if DATA_DIR:
+        path = os.path.join(DATA_DIR, filename)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{filename} is missing from ANIME_RECS_DATA_DIR ({DATA_DIR})")
+        return path
+    path = _cached("artifacts", fetch_artifacts).get(filename)
+    if not isinstance(path, str):
+        path = download(filename)     # not one of ARTIFACTS, or its first download failed: try again
+    return path
+
+
+def optional_artifact_path(filename):
+    """artifact_path(), or None when the dataset does not publish `filename`."""
+    if DATA_DIR:
+        path = os.path.join(DATA_DIR, filename)
+        return path if os.path.exists(path) else None
+    from huggingface_hub.errors import EntryNotFoundError
+    try:
+        return artifact_path(filename)
+    except EntryNotFoundError:
+        return None
+
+
+# --- Cleaning ---
+def safe_literal_eval(x):
+    if pd.isna(x) or str(x).strip() in ("", "Unknown", "[]", "['']"):
+        return []
+    try:
+        value = ast.literal_eval(str(x))
+    except (ValueError, SyntaxError, TypeError):
+        return []
+    return value if isinstance(value, list) else []
+
+
+def clean_metadata(meta_path):
+    df = pd.read_csv(meta_path)
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column: {', '.join(missing)}")
+
+    df = df.dropna(subset=['title', 'anime_id']).reset_index(drop=True)
+    df['anime_id'] = df['anime_id'].astype('int64')
+    df['genres'] = df['genres'].apply(safe_literal_eval)
+    df['genres_detailed'] = df['genres_detailed'].apply(safe_literal_eval)
+
+    # Normalize case: "movie" → "Movie", but preserve "TV" as "TV"
+    df['type'] = df['type'].astype(str).str.strip()
+    df['type'] = df['type'].apply(lambda x: x.capitalize() if x.islower() else x)
+
+    df['year_numeric'] = pd.to_numeric(df['year'], errors='coerce')
+    df['year_display'] = df['year_numeric'].fillna(0).astype(int)
+    # `episodes` keeps its original text for the cards; filtering uses the numeric copy
+    df['episodes_numeric'] = pd.to_numeric(df['episodes'], errors='coerce').fillna(0).astype(int)
+
+    df['sequel'] = df['sequel'].fillna('None')
+    df['mal_url'] = df['mal_url'].fillna('')
+    if 'alternative_title' in df.columns:
+        df['alternative_title'] = df['alternative_title'].fillna('')
+    else:
+        df['alternative_title'] = ''
+    return df
+
+
+def _read_only(index):
+    for value in vars(index).values():
+        if hasattr(value, "flags"):
+            value.flags.writeable = False
+    return index
+
+
+# --- Loaders (uncached) ---
+def load_data_from_hf():
+    catalog = load_catalog(artifact_path(METADATA_FILE), artifact_path(USER_RECS_FILE))
+    # The SVD takes seconds on a cold cache dir: run it behind the first renders, not inside one
+    catalog.start_embeddings()
+    return catalog
+
+
+def load_catalog(meta_path, recs_path, cache_dir=CACHE_DIR):
+    """Catalog from local metadata CSV and co-occurrence JSON files (no download)."""
+    df = load_snapshot(meta_path, clean_metadata, name="catalog", cache_dir=cache_dir)
+    genre_index = build_genre_index(df['genres'])
+    overlap_index = build_genre_index([g + d for g, d in zip(df['genres'], df['genres_detailed'])])
+    id_index = build_id_index(df['anime_id'])
+
+    return Catalog(
+        anime_df=df,
+        user_recs=load_or_convert(recs_path, cache_dir, file_digest(recs_path)),
+        genre_index=_read_only(genre_index),
+        overlap_index=_read_only(overlap_index),
+        id_index=_read_only(id_index),
+        cache_dir=cache_dir,
+    )
+
+
+def load_discover_data():
+    with open(artifact_path(DISCOVER_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_discover_table():
+    """The Wildcards stats table, or None without anime_stats.csv (cached like a table, so asked once)."""
+    stats_path = optional_artifact_path(ANIME_STATS_FILE)
+    if stats_path is None:
+        return None
+    stats = load_snapshot(stats_path, read_anime_stats, name="anime_stats")
+    catalog = get_catalog()
+    return _read_only(build_discover_table(catalog.anime_df, catalog.id_index, stats))
+
+
+# --- Process-wide caches shared by every page and session ---
+_lock = threading.RLock()    # re-entrant: a loader may need another cached artifact
+_cache = {}
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embeddings")
+
+
+def _cached(name, loader):
+    if name not in _cache:
+        with _lock:
+            if name not in _cache:
+                _cache[name] = loader()
+    return _cache[name]
+
+
+def get_catalog():
+    return _cached("catalog", load_data_from_hf)
+
+
+def get_discover_data():
+    return _cached("discover", load_discover_data)
+
+
+def get_discover_table():
+    return _cached("discover_table", load_discover_table)
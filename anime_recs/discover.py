@@ -0,0 +1,84 @@
+"""Runtime discover queries (hidden gems, polarizing, ...) over the per-anime rating stats.
+
+The stats table from build_discover (anime_stats.csv) is joined to the
+catalog once; every column is a flat array aligned with the catalog rows,
+so a query is a few vectorized comparisons plus a partial top-k.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from anime_recs.ranking import top_k_stable
+
+STATS_COLUMNS = {"anime_id": "int64", "rating_count": "int64", "mean_rating": "float32", "std_rating": "float32"}
+SORT_KEYS = ("score", "mean_rating", "std_rating", "rating_count")
+
+
+def read_anime_stats(stats_path):
+    stats = pd.read_csv(stats_path, usecols=list(STATS_COLUMNS), dtype=STATS_COLUMNS)
+    return stats.drop_duplicates("anime_id").reset_index(drop=True)
+
+
+@dataclass(frozen=True)
+class DiscoverTable:
+    rating_count: np.ndarray    # int64 per catalog row, 0 = no ratings
+    mean_rating: np.ndarray     # float32, NaN without ratings
+    std_rating: np.ndarray      # float32, NaN without ratings
+    score: np.ndarray           # float32 catalog score, NaN if unknown
+    year: np.ndarray            # float32, NaN if unknown
+    type_codes: np.ndarray      # int16 into type_vocab
+    type_vocab: tuple
+
+    def select(self, min_score=None, min_ratings=1, max_ratings=None, min_std=None, year_range=None,
+               types=None, rows=None):
+        """Boolean catalog-row mask; `rows` (e.g. a genre mask) is and-ed in."""
+        mask = self.rating_count >= min_ratings
+        if max_ratings is not None:
+            mask &= self.rating_count < max_ratings
+        if min_score is not None:
+            mask &= self.score >= min_score
+        if min_std is not None:
+            mask &= self.std_rating >= min_std
+        if year_range is not None:
+            mask &= (self.year >= year_range[0]) & (self.year <= year_range[1])
+        if types is not None:
+            wanted = [i for i, t in enumerate(self.type_vocab) if t in set(types)]
+            mask &= np.isin(self.type_codes, wanted)
+        if rows is not None:
+            mask &= rows
+        return mask
+
+    def top(self, mask, sort_by="score", ascending=False, limit=50):
+        """Catalog positions of the best `limit` rows in `mask` by `sort_by`, ties by position."""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+        candidates = np.flatnonzero(mask)
+        values = getattr(self, sort_by)[candidates].astype(np.float64)
+        values = np.nan_to_num(-values if ascending else values, nan=-np.inf)
+        return candidates[top_k_stable(values, limit)]
+
+
+def build_discover_table(anime_df, id_index, stats):
+    """Align the stats rows with the catalog rows (anime missing from either side get no ratings)."""
+    n = len(anime_df)
+    rating_count = np.zeros(n, dtype=np.int64)
+    mean_rating = np.full(n, np.nan, dtype=np.float32)
+    std_rating = np.full(n, np.nan, dtype=np.float32)
+
+    positions = id_index.positions(stats["anime_id"].to_numpy())
+    found = positions >= 0
+    rating_count[positions[found]] = stats["rating_count"].to_numpy()[found]
+    mean_rating[positions[found]] = stats["mean_rating"].to_numpy()[found]
+    std_rating[positions[found]] = stats["std_rating"].to_numpy()[found]
+
+    type_codes, type_vocab = pd.factorize(anime_df["type"], sort=True)
+    return DiscoverTable(
+        rating_count=rating_count,
+        mean_rating=mean_rating,
+        std_rating=std_rating,
+        score=pd.to_numeric(anime_df["score"], errors="coerce").to_numpy(np.float32),
+        year=anime_df["year_numeric"].to_numpy(np.float32),
+        type_codes=type_codes.astype(np.int16),
+        type_vocab=tuple(type_vocab),
+    )
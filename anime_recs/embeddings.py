@@ -0,0 +1,224 @@
+"""Low-rank item embeddings for anime the co-occurrence graph does not cover.
+
+Every catalog row is described by its co-occurrence edges, symmetrised so
+an anime that only shows up as someone else's neighbour still gets a
+signal, and by its genre + theme bits. A randomized truncated SVD of that
+sparse matrix gives DIM-dimensional float32 vectors. They are
+L2-normalised, so a dot product is a cosine similarity. Anime without any
+edge fall back on their genres alone.
+
+Queries score the catalog in blocks of rows with one matrix-vector
+product each. Catalogs of IVF_MIN_ROWS or more also get a coarse k-means
+(IVF) index, so a query only scores the rows in its nprobe nearest
+clusters.
+
+Built with NumPy only (the app does not depend on scipy), on first use,
+and cached under CACHE_DIR keyed by a digest of the inputs.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+
+import numpy as np
+
+from anime_recs.ranking import top_k_stable
+
+EMBED_VERSION = 1
+DIM = 64
+OVERSAMPLE = 16
+POWER_ITERATIONS = 2
+GENRE_WEIGHT = 0.5           # genre block relative to the co-occurrence block
+BLOCK_ROWS = 16384
+NNZ_CHUNK = 1 << 18
+IVF_MIN_ROWS = 100_000
+NPROBE = 8
+
+
+@dataclass(frozen=True)
+class ItemEmbeddings:
+    vectors: np.ndarray               # (n_rows, dim) float32, unit rows, aligned with the catalog rows
+    centroids: np.ndarray = None      # (n_lists, dim) float32 IVF centroids, or None
+    list_offsets: np.ndarray = None   # int64, rows of list i are list_rows[list_offsets[i]:list_offsets[i + 1]]
+    list_rows: np.ndarray = None      # int32 catalog rows grouped by list
+
+    def candidates(self, query, nprobe=NPROBE):
+        """Rows worth scoring for `query`: everything, or the members of the nprobe nearest lists."""
+        if self.centroids is None:
+            return None
+        lists = top_k_stable(self.centroids @ query, nprobe)
+        return np.concatenate([self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in lists])
+
+    def scores(self, query, rows=None):
+        """Cosine similarity of `query` to `rows` (all rows if None), one block at a time."""
+        n = len(self.vectors) if rows is None else len(rows)
+        out = np.empty(n, dtype=np.float32)
+        for start in range(0, n, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, n)
+            block = self.vectors[start:stop] if rows is None else self.vectors[rows[start:stop]]
+            np.dot(block, query, out=out[start:stop])
+        return out
+
+    def nearest(self, position, k, allowed=None, nprobe=NPROBE):
+        """Catalog rows most similar to row `position`, best first, ties by row.
+
+        `allowed` is an optional boolean row mask; the query row itself is never returned.
+        An unknown position (-1) gives rows in catalog order.
+        """
+        n = len(self.vectors)
+        allowed = np.ones(n, dtype=bool) if allowed is None else allowed.copy()
+        if 0 <= position < n:
+            allowed[position] = False
+            query = self.vectors[position]
+        else:
+            query = np.zeros(self.vectors.shape[1], dtype=np.float32)
+        return self.search(query, k, allowed, nprobe)
+
+    def search(self, query, k, allowed=None, nprobe=NPROBE):
+        """Allowed catalog rows most similar to an arbitrary `query` vector, best first."""
+        query = np.asarray(query, dtype=np.float32)
+        if allowed is None:
+            allowed = np.ones(len(self.vectors), dtype=bool)
+        rows = self.candidates(query, nprobe) if query.any() else None
+        if rows is not None:
+            rows = np.sort(rows[allowed[rows]])
+            if len(rows) < k:    # the probed lists ran dry under the filter: score everything
+                rows = None
+        if rows is None:
+            rows = np.flatnonzero(allowed)
+        return rows[top_k_stable(self.scores(query, rows), k)]
+
+
+# --- Building ---
+def _csr_matmul(indptr, indices, data, dense):
+    """(sparse CSR) @ dense, in chunks of non-zeros so the gathered rows stay small."""
+    out = np.zeros((len(indptr) - 1, dense.shape[1]), dtype=dense.dtype)
+    row_of = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    for start in range(0, len(indices), NNZ_CHUNK):
+        stop = min(start + NNZ_CHUNK, len(indices))
+        rows = row_of[start:stop]
+        products = dense[indices[start:stop]] * data[start:stop, None]
+        heads = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        out[rows[heads]] += np.add.reduceat(products, heads, axis=0)
+    return out
+
+
+def cooccurrence_matrix(graph, id_index, n):
+    """Symmetrised, rank-discounted co-occurrence edges between catalog rows, as normalised CSR."""
+    lengths = np.diff(graph.offsets)
+    seeds = np.repeat(np.arange(len(lengths)), lengths)
+    rank = np.arange(len(graph.neighbours)) - np.repeat(graph.offsets[:-1], lengths)
+    rows = id_index.positions(seeds)
+    cols = id_index.positions(graph.neighbours)
+    valid = (rows >= 0) & (cols >= 0) & (rows != cols)
+    rows, cols = rows[valid].astype(np.int64), cols[valid].astype(np.int64)
+    weights = (1.0 / np.log2(rank[valid] + 2.0)).astype(np.float32)
+
+    rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+    weights = np.concatenate([weights, weights])
+    order = np.argsort(rows, kind="stable")
+    rows, cols, weights = rows[order], cols[order], weights[order]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+    # D^-1/2 A D^-1/2 keeps the matrix symmetric while damping very connected anime
+    degree = np.sqrt(np.maximum(np.bincount(rows, weights=weights, minlength=n), 1e-12))
+    weights = (weights / (degree[rows] * degree[cols])).astype(np.float32)
+    return indptr, cols, weights
+
+
+def genre_matrix(genre_index):
+    """Dense (n_rows, n_genres) float32 genre bits, row-normalised."""
+    bits = np.unpackbits(genre_index.masks.view(np.uint8), axis=1, bitorder="little")[:, :len(genre_index.vocab)]
+    dense = bits.astype(np.float32)
+    dense /= np.maximum(np.sqrt(dense.sum(axis=1, keepdims=True)), 1.0)
+    return dense
+
+
+def truncated_svd_embeddings(indptr, indices, data, genres, dim=DIM, seed=0):
+    """Row vectors U * S of a randomized SVD of [cooccurrence | GENRE_WEIGHT * genres], unit length."""
+    n, g = genres.shape
+    rank = min(dim + OVERSAMPLE, n + g)
+    genres = genres * np.float32(GENRE_WEIGHT)
+
+    def apply(right):             # X @ right, right is (n + g, r)
+        return _csr_matmul(indptr, indices, data, right[:n]) + genres @ right[n:]
+
+    def apply_t(left):            # X.T @ left, the co-occurrence block is symmetric
+        return np.vstack([_csr_matmul(indptr, indices, data, left), genres.T @ left])
+
+    rng = np.random.default_rng(seed)
+    basis, _ = np.linalg.qr(apply(rng.standard_normal((n + g, rank)).astype(np.float32)))
+    for _ in range(POWER_ITERATIONS):
+        row_basis, _ = np.linalg.qr(apply_t(basis))
+        basis, _ = np.linalg.qr(apply(row_basis))
+    u, s, _ = np.linalg.svd(apply_t(basis).T, full_matrices=False)
+    vectors = (basis @ u[:, :dim]) * s[:dim]
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+def build_ivf(vectors, n_lists, iterations=10, seed=0):
+    """Spherical k-means over the rows; returns centroids, list offsets and grouped rows."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.concatenate([np.argmax(vectors[s:s + BLOCK_ROWS] @ centroids.T, axis=1)
+                                 for s in range(0, len(vectors), BLOCK_ROWS)])
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = np.bincount(assign, minlength=n_lists) == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    order = np.argsort(assign, kind="stable")
+    offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assign, minlength=n_lists), out=offsets[1:])
+    return centroids.astype(np.float32), offsets, order.astype(np.int32)
+
+
+def build_item_embeddings(graph, id_index, genre_index, dim=DIM, ivf=None):
+    """Embeddings for every catalog row; `ivf` None means "only for large catalogs"."""
+    genres = genre_matrix(genre_index)
+    vectors = truncated_svd_embeddings(*cooccurrence_matrix(graph, id_index, len(genres)), genres, dim=dim)
+    if ivf is None:
+        ivf = len(vectors) >= IVF_MIN_ROWS
+    if not ivf:
+        return ItemEmbeddings(vectors=vectors)
+    centroids, offsets, rows = build_ivf(vectors, max(1, int(np.sqrt(len(vectors)))))
+    return ItemEmbeddings(vectors=vectors, centroids=centroids, list_offsets=offsets, list_rows=rows)
+
+
+# --- Cache ---
+def embedding_key(graph, id_index, genre_index, dim=DIM):
+    h = hashlib.blake2b(f"v{EMBED_VERSION}-{dim}".encode(), digest_size=16)
+    for arr in (graph.offsets, graph.neighbours, id_index.pos_of, genre_index.masks):
+        h.update(np.ascontiguousarray(arr).view(np.uint8))
+    return h.hexdigest()
+
+
+def load_or_build(graph, id_index, genre_index, cache_dir, dim=DIM):
+    """Embeddings for these inputs from the cache, building and caching them on first use."""
+    directory = os.path.join(cache_dir, "embeddings")
+    key = embedding_key(graph, id_index, genre_index, dim)
+    path = os.path.join(directory, f"items-{key}.npz")
+    if os.path.exists(path):
+        try:
+            with np.load(path) as arrays:
+                return ItemEmbeddings(**{name: arrays[name] for name in arrays.files})
+        except (OSError, ValueError, KeyError):
+            os.remove(path)
+
+    embeddings = build_item_embeddings(graph, id_index, genre_index, dim=dim)
+    arrays = {name: value for name, value in vars(embeddings).items() if value is not None}
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".items-", suffix=".npz", dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        for old in os.listdir(directory):
+            if old.startswith("items-") and old != os.path.basename(path):
+                os.remove(os.path.join(directory, old))
+    except OSError:
+        pass
+    return embeddings
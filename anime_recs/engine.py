@@ -0,0 +1,180 @@
+"""Recommendation engine shared by the Streamlit app, the HTTP service and batch jobs.
+
+Every function takes the Catalog explicitly instead of reading page
+globals, so the same code runs inside Streamlit, behind
+anime_recs.service and in worker processes.
+
+The recommenders work on catalog row positions (anime_df keeps a
+RangeIndex, so a row label is its position) and boolean row masks, and
+only turn them into anime_ids at the end: no DataFrame is built per
+request. The app turns the ids back into rows for display.
+"""
+import numpy as np
+
+from anime_recs import metrics
+from anime_recs.hybrid import fuse_hybrid
+from anime_recs.multi_seed import recommend_for_seeds
+from anime_recs.ranking import top_k_stable
+from anime_recs.rec_cache import get_rec_cache, recommendation_key
+
+MAX_RECOMMENDATIONS = 50
+LISTS = ("user", "genre", "hybrid")
+
+
+# --- Recommenders over catalog rows ---
+def filter_rows(catalog, include_genres, exclude_genres, preserve_anime_id=None):
+    """Boolean row mask of the genre filter; `preserve_anime_id` always passes."""
+    keep = None
+    if preserve_anime_id is not None:
+        keep = catalog.anime_df['anime_id'].to_numpy() == preserve_anime_id
+    return catalog.genre_index.filter_mask(include_genres, exclude_genres, keep=keep)
+
+
+def user_based_rows(catalog, current_anime_id, allowed, n=MAX_RECOMMENDATIONS):
+    """Co-occurrence neighbours passing `allowed`, in ranked order, padded by item embedding.
+
+    Until the embeddings are built, padding takes the allowed anime sharing
+    the most genres instead. Raises KeyError for an id not in the catalog.
+    """
+    id_index = catalog.id_index
+    current = id_index.position(current_anime_id)
+    if current < 0:
+        raise KeyError(current_anime_id)
+    found = id_index.positions(catalog.user_recs.neighbours_of(current_anime_id)[:n])
+    found = found[found >= 0]
+    rows = found[allowed[found]]
+    if len(rows) < n:
+        # Anime missing from the graph, or neighbours lost to the filter: pad with the
+        # nearest allowed anime by item embedding
+        allowed = allowed.copy()
+        allowed[rows] = False
+        allowed[current] = False
+        embeddings = catalog.ready_embeddings()
+        if embeddings is None:
+            genres = catalog.anime_df.at[current, 'genres']
+            pad = genre_based_rows(catalog, genres, allowed, current_anime_id, n - len(rows))
+        else:
+            pad = embeddings.nearest(current, n - len(rows), allowed=allowed)
+        rows = np.concatenate([rows, pad])
+    return rows[:n]
+
+
+def genre_based_rows(catalog, selected_genres, allowed, current_anime_id, n=MAX_RECOMMENDATIONS):
+    """Allowed rows sharing the most of `selected_genres`, ties in catalog order."""
+    candidates = np.flatnonzero(allowed)
+    candidates = candidates[candidates != catalog.id_index.position(current_anime_id)]
+    selected_genres = set(selected_genres)
+    if not selected_genres:
+        # Same draw as DataFrame.sample(random_state=100), which the app used before
+        size = min(n, len(candidates))
+        return candidates[np.random.RandomState(100).choice(len(candidates), size=size, replace=False)]
+
+    # One popcount over the genres + genres_detailed bitmasks of the candidate rows
+    overlap = catalog.overlap_index.overlap_counts(selected_genres, positions=candidates)
+    n_candidates = int((overlap > 0).sum())
+    if n_candidates == 0:
+        return candidates[:n]
+    return candidates[top_k_stable(overlap, min(n, n_candidates))]
+
+
+def ids_of_rows(catalog, rows):
+    """anime_ids of catalog rows as a read-only int32 array, the form the result cache keeps."""
+    ids = catalog.anime_df['anime_id'].to_numpy()[rows].astype(np.int32)
+    ids.flags.writeable = False
+    return ids
+
+
+# --- Id-level results, memoized process-wide ---
+def seed_genres(catalog, anime_id):
+    position = catalog.id_index.position(anime_id)
+    if position < 0:
+        raise KeyError(anime_id)
+    return catalog.anime_df.at[position, 'genres']
+
+
+def get_cached_recs(catalog, current_anime_id, include_genres, exclude_genres):
+    """(user_ids, genre_ids) for one anime, each MAX_RECOMMENDATIONS long at most.
+
+    Results padded before the embeddings are ready are returned but not cached.
+    """
+    ready = catalog.ready_embeddings() is not None
+
+    def compute():
+        selected_genres = seed_genres(catalog, current_anime_id)
+        with metrics.span("genre_filter"):
+            allowed = filter_rows(catalog, include_genres, exclude_genres, preserve_anime_id=current_anime_id)
+        with metrics.span("user_recs"):
+            user_rows = user_based_rows(catalog, current_anime_id, allowed, n=MAX_RECOMMENDATIONS)
+        with metrics.span("genre_recs"):
+            genre_rows = genre_based_rows(catalog, selected_genres, allowed, current_anime_id, n=MAX_RECOMMENDATIONS)
+        return ids_of_rows(catalog, user_rows), ids_of_rows(catalog, genre_rows)
+    key = recommendation_key(current_anime_id, include_genres, exclude_genres)
+    return get_rec_cache().get_or_compute(key, compute, store=ready)
+
+
+def get_cached_hybrid_recs(current_anime_id, include_genres, exclude_genres, user_ids, genre_ids, weight_user):
+    def compute():
+        with metrics.span("hybrid_recs"):
+            return fuse_hybrid(user_ids, genre_ids, weight_user=weight_user, total=MAX_RECOMMENDATIONS)[0]
+    cache = get_rec_cache()
+    # Only kept if the lists it fuses were: provisional lists give a provisional blend
+    lists_cached = recommendation_key(current_anime_id, include_genres, exclude_genres) in cache
+    key = recommendation_key(current_anime_id, include_genres, exclude_genres, weight_user)
+    return cache.get_or_compute(key, compute, store=lists_cached)
+
+
+def get_cached_seed_recs(catalog, seed_ids, include_genres, exclude_genres):
+    ready = catalog.ready_embeddings() is not None
+
+    def compute():
+        with metrics.span("seed_recs"):
+            return recommend_for_seeds(catalog, seed_ids, n=MAX_RECOMMENDATIONS,
+                                       include_genres=include_genres, exclude_genres=exclude_genres)
+    return get_rec_cache().get_or_compute(recommendation_key(seed_ids, include_genres, exclude_genres), compute,
+                                          store=ready)
+
+
+# --- Scored results (service and batch jobs) ---
+def user_scores(catalog, anime_id, ids):
+    """Co-occurrence weight of each id for `anime_id`; NaN for padding or a graph without weights."""
+    scores = np.full(len(ids), np.nan, dtype=np.float32)
+    weights = catalog.user_recs.weights_of(anime_id)
+    neighbours = catalog.user_recs.neighbours_of(anime_id)
+    if weights is None or len(neighbours) == 0 or len(ids) == 0:
+        return scores
+    order = np.argsort(neighbours, kind="stable")
+    found = np.minimum(np.searchsorted(neighbours[order], ids), len(order) - 1)
+    hit = neighbours[order][found] == ids
+    scores[hit] = weights[order[found[hit]]]
+    return scores
+
+
+def genre_scores(catalog, anime_id, ids):
+    """Number of the seed's genres each id shares (genres + genres_detailed)."""
+    return catalog.overlap_index.overlap_counts(
+        seed_genres(catalog, anime_id), positions=catalog.id_index.positions(ids)
+    ).astype(np.float32)
+
+
+def recommend(catalog, anime_id, include_genres=(), exclude_genres=(), weight_user=0.5,
+              n=MAX_RECOMMENDATIONS, lists=LISTS):
+    """{list name: (anime_ids, scores)} for one anime; raises KeyError for an unknown id."""
+    anime_id = int(anime_id)
+    seed_genres(catalog, anime_id)
+    n = max(0, min(int(n), MAX_RECOMMENDATIONS))
+    user_ids, genre_ids = get_cached_recs(catalog, anime_id, include_genres, exclude_genres)
+    out = {}
+    if "user" in lists:
+        out["user"] = (user_ids[:n], user_scores(catalog, anime_id, user_ids[:n]))
+    if "genre" in lists:
+        out["genre"] = (genre_ids[:n], genre_scores(catalog, anime_id, genre_ids[:n]))
+    if "hybrid" in lists:
+        ids, scores = fuse_hybrid(user_ids, genre_ids, weight_user=weight_user, total=n)
+        out["hybrid"] = (ids, scores.astype(np.float32))
+    return out
+
+
+def scored_json(ids, scores, digits=4):
+    """Compact JSON-ready form: parallel id and score lists, NaN as null."""
+    rounded = np.round(scores.astype(np.float64), digits)
+    return {"ids": ids.tolist(), "scores": [None if s != s else s for s in rounded.tolist()]}
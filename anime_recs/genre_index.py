@@ -0,0 +1,84 @@
+"""Bitmask genre index: one bit per genre, one row of uint64 words per anime."""
+from dataclasses import dataclass
+
+import numpy as np
+
+WORD_BITS = 64
+
+
+def _clean_genres(genre_list):
+    if not isinstance(genre_list, list):
+        return []
+    return [str(g).strip() for g in genre_list]
+
+
+@dataclass(frozen=True)
+class GenreIndex:
+    vocab: list            # sorted genre names; position == bit number
+    bit_of: dict           # genre name -> bit number
+    masks: np.ndarray      # (n_rows, n_words) uint64, aligned with the catalog rows
+
+    @property
+    def n_words(self):
+        return self.masks.shape[1]
+
+    def encode(self, genres):
+        """Query mask for a list of genre names; unknown genres are ignored."""
+        query = np.zeros(self.n_words, dtype=np.uint64)
+        for g in genres:
+            bit = self.bit_of.get(str(g).strip())
+            if bit is not None:
+                query[bit // WORD_BITS] |= np.uint64(1) << np.uint64(bit % WORD_BITS)
+        return query
+
+    def any_of(self, genres, positions=None):
+        """Boolean row mask: rows sharing at least one genre with `genres`."""
+        masks = self.masks if positions is None else self.masks[positions]
+        return (masks & self.encode(genres)).any(axis=1)
+
+    def filter_mask(self, include_genres, exclude_genres, keep=None, positions=None):
+        """Include/exclude mask over all rows, or over just the given row positions."""
+        mask = np.ones(len(self.masks) if positions is None else len(positions), dtype=bool)
+        if include_genres:
+            mask &= self.any_of(include_genres, positions)
+        if exclude_genres:
+            mask &= ~self.any_of(exclude_genres, positions)
+        if keep is not None:
+            mask |= keep
+        return mask
+
+    def overlap_counts(self, genres, positions=None):
+        """How many of `genres` each row has, optionally only for the given row positions."""
+        masks = self.masks if positions is None else self.masks[positions]
+        return popcount_rows(masks & self.encode(genres))
+
+
+def build_genre_index(genre_lists):
+    cleaned = [_clean_genres(g) for g in genre_lists]
+    vocab = sorted({g for genres in cleaned for g in genres})
+    bit_of = {g: i for i, g in enumerate(vocab)}
+    n_words = max(1, -(-len(vocab) // WORD_BITS))
+
+    rows, bits = [], []
+    for row, genres in enumerate(cleaned):
+        for g in genres:
+            rows.append(row)
+            bits.append(bit_of[g])
+    rows = np.asarray(rows, dtype=np.int64)
+    bits = np.asarray(bits, dtype=np.int64)
+
+    masks = np.zeros((len(cleaned), n_words), dtype=np.uint64)
+    values = np.left_shift(np.uint64(1), (bits % WORD_BITS).astype(np.uint64))
+    np.bitwise_or.at(masks, (rows, bits // WORD_BITS), values)
+    return GenreIndex(vocab=vocab, bit_of=bit_of, masks=masks)
+
+
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount_rows(words):
+    """Number of set bits per row of a (n_rows, n_words) uint64 array."""
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    as_bytes = np.ascontiguousarray(words).view(np.uint8).reshape(len(words), -1)
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=1, dtype=np.int64)
@@ -0,0 +1,37 @@
+"""Deterministic hybrid blending by weighted reciprocal-rank fusion (RRF).
+
+Each list contributes weight / (k + rank) for every anime it ranks
+(rank starting at 1); an anime in both lists gets both terms. `weight_user`
+mixes the co-occurrence list against the genre list. The output depends
+only on the inputs, so it can be cached.
+"""
+import numpy as np
+
+RRF_K = 60
+
+
+def fuse_hybrid(user_ids, genre_ids, weight_user=0.5, total=50, k=RRF_K):
+    """Fused (anime_ids, scores), best first, at most `total` long.
+
+    Ties (e.g. weight 0.5 and mirrored ranks) go to the better single-list
+    rank, then to the co-occurrence list, then to the lower anime_id.
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    genre_ids = np.asarray(genre_ids, dtype=np.int64)
+    ids = np.concatenate([user_ids, genre_ids])
+    if len(ids) == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+
+    ranks = np.concatenate([np.arange(1, len(user_ids) + 1), np.arange(1, len(genre_ids) + 1)])
+    weights = np.concatenate([np.full(len(user_ids), weight_user), np.full(len(genre_ids), 1.0 - weight_user)])
+    source = np.concatenate([np.zeros(len(user_ids), dtype=np.int8), np.ones(len(genre_ids), dtype=np.int8)])
+
+    unique_ids, inverse = np.unique(ids, return_inverse=True)
+    scores = np.bincount(inverse, weights=weights / (k + ranks), minlength=len(unique_ids))
+    best_rank = np.full(len(unique_ids), np.iinfo(np.int64).max)
+    np.minimum.at(best_rank, inverse, ranks)
+    first_source = np.ones(len(unique_ids), dtype=np.int8)
+    np.minimum.at(first_source, inverse, source)
+
+    order = np.lexsort((unique_ids, first_source, best_rank, -scores))[:total]
+    return unique_ids[order].astype(np.int32), scores[order]
@@ -0,0 +1,29 @@
+"""anime_id -> catalog position lookups (dense array)."""
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class IdIndex:
+    pos_of: np.ndarray     # dense int32 array indexed by anime_id, -1 where absent
+
+    def positions(self, anime_ids):
+        """Catalog positions for `anime_ids`, -1 for ids not in the catalog."""
+        ids = np.asarray(anime_ids, dtype=np.int64)
+        out = np.full(len(ids), -1, dtype=np.int32)
+        valid = (ids >= 0) & (ids < len(self.pos_of))
+        out[valid] = self.pos_of[ids[valid]]
+        return out
+
+    def position(self, anime_id):
+        return int(self.positions([anime_id])[0])
+
+
+def build_id_index(anime_ids):
+    ids = np.asarray(anime_ids, dtype=np.int64)
+    size = int(ids.max()) + 1 if len(ids) else 0
+    pos_of = np.full(size, -1, dtype=np.int32)
+    # Reverse order so the first occurrence of a duplicated id wins
+    pos_of[ids[::-1]] = np.arange(len(ids) - 1, -1, -1, dtype=np.int32)
+    return IdIndex(pos_of=pos_of)
@@ -0,0 +1,168 @@
+"""Jikan (unofficial MyAnimeList API) client shared by every session in the process.
+
+One pooled keep-alive session, a token-bucket limiter sized to Jikan's
+published limits (3 requests/second, 60/minute), and retries with
+jittered exponential backoff on 429, 5xx and network errors. Background
+requests (prefetch) never draw a bucket below `background_reserve`
+tokens, so a user's own lookup does not queue behind them. The base URL
+and the limits are constructor arguments so the client can be pointed at
+a local stub server (anime_recs.jikan_stub).
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+JIKAN_BASE_URL = os.environ.get("JIKAN_BASE_URL", "https://api.jikan.moe/v4")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class JikanError(Exception):
+    pass
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` banked."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, reserve=0.0):
+        """Take a token unless that would leave fewer than `reserve`; returns (wait seconds, taken)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if reserve and self._tokens - 1 < reserve:
+                return (reserve + 1 - self._tokens) / self.rate, False
+            self._tokens -= 1
+            return (0.0 if self._tokens >= 0 else -self._tokens / self.rate), True
+
+    def acquire(self, reserve=0.0):
+        """Block until a token is ours; with `reserve`, only take it while more than `reserve` remain."""
+        while True:
+            wait, taken = self._reserve(reserve)
+            if wait > 0:
+                time.sleep(wait)
+            if taken:
+                return
+
+
+class JikanClient:
+    def __init__(self, base_url=JIKAN_BASE_URL, per_second=3, per_minute=60, timeout=10,
+                 max_retries=4, backoff_base=0.5, backoff_cap=8.0, pool_size=8, background_reserve=1):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.pool_size = pool_size
+        self.background_reserve = background_reserve
+        self.limits = [TokenBucket(per_second, per_second), TokenBucket(per_minute / 60.0, per_minute)]
+
+        # Imported here: requests is only needed once a synopsis actually has to be fetched
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.network_errors = (requests.ConnectionError, requests.Timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+        # "Full jitter": uniform over [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def get_json(self, path, background=False):
+        last_error = None
+        reserve = self.background_reserve if background else 0
+        for attempt in range(self.max_retries + 1):
+            for bucket in self.limits:
+                bucket.acquire(reserve)
+            try:
+                response = self.session.get(f"{self.base_url}{path}", timeout=self.timeout)
+            except self.network_errors as e:
+                last_error = e
+                if attempt < self.max_retries:
+                    time.sleep(self._backoff(attempt))
+                continue
+            if response.status_code == 200:
+                try:
+                    return response.json()
+                except ValueError as e:
+                    raise JikanError(f"invalid JSON for {path}") from e
+            if response.status_code == 404:
+                return None
+            last_error = JikanError(f"HTTP {response.status_code} for {path}")
+            if response.status_code not in RETRY_STATUSES:
+                break
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+        raise JikanError(str(last_error)) from last_error
+
+    # --- Lookups ---
+    @staticmethod
+    def _description(anime):
+        description = anime.get('synopsis', 'No description available.')
+        jikan_img = anime.get('images', {}).get('jpg', {}).get('image_url', '')
+        return description, jikan_img
+
+    def search_description(self, title):
+        """(synopsis, image_url) of the best title-search match, or None when nothing matches."""
+        data = self.get_json(f"/anime?q={quote(title)}&limit=1")
+        if data and data.get('data'):
+            return self._description(data['data'][0])
+        return None
+
+    def get_description(self, mal_id, background=False):
+        """(synopsis, image_url) of the anime with this MyAnimeList id, or None if unknown.
+
+        The catalog's anime_id is the MAL id, so this is an exact lookup and
+        cheaper for Jikan than a title search. `background` lookups yield
+        to foreground ones at the rate limiter.
+        """
+        data = self.get_json(f"/anime/{int(mal_id)}", background=background)
+        if data and data.get('data'):
+            return self._description(data['data'])
+        return None
+
+    def fetch_many(self, keys, lookup=None, max_workers=None):
+        """Run `lookup` (default: search_description) for many keys in parallel, within the rate limit.
+
+        Returns results in input order; a failed lookup yields its JikanError.
+        """
+        lookup = lookup or self.search_description
+
+        def one(key):
+            try:
+                return lookup(key)
+            except JikanError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.pool_size) as pool:
+            return list(pool.map(one, keys))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client, so all Streamlit sessions share one pool and one limiter."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = JikanClient()
+    return _client
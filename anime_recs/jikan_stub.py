@@ -0,0 +1,145 @@
+"""Local stand-in for the Jikan API, for testing the client offline.
+
+    python -m anime_recs.jikan_stub --port 8700 --latency 0.3 --error-rate 0.2
+    JIKAN_BASE_URL=http://127.0.0.1:8700/v4 streamlit run Animerecommender.py
+
+Answers /anime/<id> and /anime?q=<title> with canned synopses after
+`latency` seconds. Ids from MISSING_FROM up are unknown (404). Errors come
+from `error_rate` (random 429s) or from `script`, a queue of statuses
+answered before any normal response: an int is sent as that HTTP status
+(with Retry-After on 429 when `retry_after` is set) and "bad_json" sends a
+200 whose body is not JSON. Every request is logged in `requests` as
+(monotonic time, path).
+"""
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+MISSING_FROM = 900_000
+
+
+def anime_json(mal_id, title=None):
+    return {
+        "mal_id": mal_id,
+        "title": title or f"Anime {mal_id}",
+        "synopsis": f"Synopsis of {title or mal_id}.",
+        "images": {"jpg": {"image_url": f"https://cdn.example/anime/{mal_id}.jpg"}},
+    }
+
+
+class StubJikan:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, retry_after=None, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.script = collections.deque()
+        self.requests = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v4"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="jikan-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _next_status(self):
+        with self._lock:
+            if self.script:
+                return self.script.popleft()
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return 429
+            return None
+
+    def respond(self, path):
+        """(status, headers, body bytes) for one request."""
+        self.requests.append((time.monotonic(), path))
+        status = self._next_status()
+        if status == "bad_json":
+            return 200, {}, b"<html>maintenance</html>"
+        if status is not None:
+            headers = {"Retry-After": str(self.retry_after)} if status == 429 and self.retry_after is not None else {}
+            return status, headers, json.dumps({"status": status, "message": "stub error"}).encode()
+
+        url = urlsplit(path)
+        parts = url.path.rstrip("/").split("/")
+        if parts[-2:-1] == ["anime"] and parts[-1].isdigit():
+            mal_id = int(parts[-1])
+            if mal_id >= MISSING_FROM:
+                return 404, {}, b'{"status": 404}'
+            return 200, {}, json.dumps({"data": anime_json(mal_id)}).encode()
+        if parts[-1] == "anime":
+            title = parse_qs(url.query).get("q", [""])[0]
+            data = [anime_json(zlib.crc32(title.encode()) % MISSING_FROM, title)] if title else []
+            return 200, {}, json.dumps({"data": data}).encode()
+        return 404, {}, b'{"status": 404}'
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status, headers, body = stub.respond(self.path)
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass     # the client timed out and went away
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Jikan API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before every answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, help="Retry-After header sent with each 429")
+    args = parser.parse_args(argv)
+
+    stub = StubJikan(args.host, args.port, args.latency, args.error_rate, args.retry_after)
+    print(f"serving a stub Jikan API on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
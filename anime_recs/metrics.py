@@ -0,0 +1,209 @@
+"""Per-stage timings and cache counters, exported as Prometheus text, JSON or a file.
+
+Off unless a sink is configured:
+    ANIME_RECS_METRICS_PORT=9464   serve /metrics (Prometheus text) and /metrics.json from a
+                                   background thread (ANIME_RECS_METRICS_HOST, default 127.0.0.1)
+    ANIME_RECS_METRICS_FILE=path   rewrite the file every ANIME_RECS_METRICS_INTERVAL seconds
+                                   (default 15); Prometheus text for *.prom, JSON otherwise
+
+Code marks a stage with `with metrics.span("stage"):`, or keeps the span
+and calls .stop() when the stage is a whole page rerun. While metrics are
+off span() returns one shared no-op object, so an instrumented line costs
+a function call.
+
+Each stage keeps a count, a total and its last RESERVOIR durations, from
+which p50/p95/p99 are taken at export time. Cache counters are not copied
+on every hit: the stats() of the process-wide caches are read when the
+metrics are exported.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+RESERVOIR = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+METRICS_HOST = os.environ.get("ANIME_RECS_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.environ.get("ANIME_RECS_METRICS_PORT")
+METRICS_FILE = os.environ.get("ANIME_RECS_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("ANIME_RECS_METRICS_INTERVAL", "15"))
+ENABLED = bool(METRICS_PORT or METRICS_FILE)
+
+
+class StageTimings:
+    """Thread-safe per-stage count, sum and a ring of recent durations (seconds)."""
+
+    def __init__(self, reservoir=RESERVOIR):
+        self.reservoir = reservoir
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0, 0.0, [0.0] * self.reservoir]
+            entry[2][entry[0] % self.reservoir] = seconds
+            entry[0] += 1
+            entry[1] += seconds
+
+    def snapshot(self):
+        """{stage: {count, sum_s, p50_s, p95_s, p99_s}}; percentiles over the recent durations."""
+        with self._lock:
+            stages = {name: (count, total, samples[:min(count, self.reservoir)])
+                      for name, (count, total, samples) in self._stages.items()}
+        out = {}
+        for name, (count, total, samples) in sorted(stages.items()):
+            values = np.percentile(samples, [q * 100 for q in QUANTILES])
+            out[name] = dict(count=count, sum_s=total,
+                             **{f"p{round(q * 100)}_s": float(v) for q, v in zip(QUANTILES, values)})
+        return out
+
+
+class _Span:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.started = time.perf_counter()
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stop(self):
+        get_timings().record(self.stage, time.perf_counter() - self.started)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def stop(self):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage):
+    """Timer for one stage, running from here: use it as a context manager or call .stop()."""
+    return _Span(stage) if ENABLED else _NO_SPAN
+
+
+# --- Export ---
+def cache_counters():
+    # Imported here: the exporter runs long after these modules are loaded, and only when enabled
+    from anime_recs.prefetch import get_prefetcher
+    from anime_recs.rec_cache import get_rec_cache
+    from anime_recs.synopsis_cache import get_synopsis_cache
+    return {
+        "rec_cache": get_rec_cache().stats(),
+        "synopsis_cache": get_synopsis_cache().stats(),
+        "prefetch": dict(get_prefetcher().counters),
+    }
+
+
+def snapshot():
+    return {"stages": get_timings().snapshot(), "caches": cache_counters(), "time": time.time()}
+
+
+def prometheus_text(data):
+    lines = ["# HELP anime_recs_stage_seconds Duration of one stage of a page rerun.",
+             "# TYPE anime_recs_stage_seconds summary"]
+    for stage, s in data["stages"].items():
+        for q in QUANTILES:
+            lines.append(f'anime_recs_stage_seconds{{stage="{stage}",quantile="{q}"}} {s[f"p{round(q * 100)}_s"]:.6g}')
+        lines.append(f'anime_recs_stage_seconds_sum{{stage="{stage}"}} {s["sum_s"]:.6g}')
+        lines.append(f'anime_recs_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+    lines += ["# HELP anime_recs_cache Counters and sizes of the process-wide caches.",
+              "# TYPE anime_recs_cache gauge"]
+    for cache, fields in data["caches"].items():
+        for field, value in fields.items():
+            lines.append(f'anime_recs_cache{{cache="{cache}",field="{field}"}} {value:.6g}')
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = prometheus_text(snapshot()).encode(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_file(path):
+    data = snapshot()
+    text = prometheus_text(data) if path.endswith(".prom") else json.dumps(data, indent=2)
+    fd, tmp = tempfile.mkstemp(prefix=".metrics-", dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _file_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_file(path)
+        except OSError:
+            pass
+
+
+_timings = None
+_sinks_started = False
+_lock = threading.Lock()
+
+
+def get_timings():
+    global _timings
+    if _timings is None:
+        with _lock:
+            if _timings is None:
+                _timings = StageTimings()
+    return _timings
+
+
+def start_sinks():
+    """Start the configured exporters once per process; does nothing while metrics are off."""
+    global _sinks_started
+    if not ENABLED or _sinks_started:
+        return
+    with _lock:
+        if _sinks_started:
+            return
+        _sinks_started = True
+        if METRICS_PORT:
+            try:
+                server = ThreadingHTTPServer((METRICS_HOST, int(METRICS_PORT)), _Handler)
+            except OSError:
+                server = None     # another process (or an earlier run of this one) owns the port
+            if server is not None:
+                server.daemon_threads = True
+                threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        if METRICS_FILE:
+            threading.Thread(target=_file_loop, args=(METRICS_FILE, METRICS_INTERVAL),
+                             name="metrics-file", daemon=True).start()
@@ -0,0 +1,162 @@
+"""Batch job: precompute co-occurrence, genre and hybrid recommendations for the whole catalog.
+
+    python -m anime_recs.precompute all_recs.npz --workers 8 [--chunk 256] [--lists hybrid]
+
+The catalog (and its item embeddings) is loaded once in the parent. With
+the fork start method the worker processes inherit it copy-on-write, so
+no worker reloads or unpickles anything; elsewhere each worker loads it
+once from the local Hugging Face cache. anime_ids go out in chunks and
+every chunk comes back as a few flat arrays, so IPC stays small and the
+throughput scales with the number of worker processes.
+
+The output is long and columnar, one row per (anime, list, rank):
+    anime_id  int32
+    list      uint8 index into the `lists` array (user, genre, hybrid)
+    rank      int16, 0-based
+    rec_id    int32
+    score     float32, NaN where the list has no score
+It is written as .npz, or as Parquet when the path ends in .parquet
+(needs pyarrow). read_results() loads either as a DataFrame.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from anime_recs import engine
+from anime_recs.data import get_catalog
+
+CHUNK_SIZE = 256
+PROGRESS_SECONDS = 2.0
+COLUMNS = {"anime_id": np.int32, "list": np.uint8, "rank": np.int16, "rec_id": np.int32, "score": np.float32}
+
+_catalog = None      # set in the parent before forking, inherited by the workers
+
+
+def _worker_catalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = get_catalog()
+    return _catalog
+
+
+def chunk_results(anime_ids, params):
+    """Columns for one chunk of anime_ids; unknown ids are skipped."""
+    catalog = _worker_catalog()
+    parts = {name: [] for name in COLUMNS}
+    for anime_id in anime_ids:
+        try:
+            results = engine.recommend(catalog, anime_id, **params)
+        except KeyError:
+            continue
+        for code, name in enumerate(engine.LISTS):
+            if name not in results:
+                continue
+            ids, scores = results[name]
+            parts["anime_id"].append(np.full(len(ids), anime_id))
+            parts["list"].append(np.full(len(ids), code))
+            parts["rank"].append(np.arange(len(ids)))
+            parts["rec_id"].append(ids)
+            parts["score"].append(scores)
+    return concat_columns(parts)
+
+
+def concat_columns(parts):
+    """{column: list of arrays} -> {column: one array}."""
+    return {name: np.concatenate(parts[name]).astype(dtype, copy=False) if parts[name] else np.empty(0, dtype=dtype)
+            for name, dtype in COLUMNS.items()}
+
+
+def precompute(anime_ids=None, workers=1, chunk_size=CHUNK_SIZE, log=print, **params):
+    """Columns for every anime in `anime_ids` (default: the whole catalog), in input order."""
+    global _catalog
+    _catalog = get_catalog()
+    _catalog.embeddings        # built before forking so every worker shares it
+    if anime_ids is None:
+        anime_ids = _catalog.anime_df['anime_id'].to_numpy()
+    anime_ids = np.asarray(anime_ids, dtype=np.int64)
+    chunks = [anime_ids[i:i + chunk_size] for i in range(0, len(anime_ids), chunk_size)]
+    results = [None] * len(chunks)
+    started = last_log = time.perf_counter()
+    done = 0
+
+    def progress(index, columns):
+        nonlocal done, last_log
+        results[index] = columns
+        done += len(chunks[index])
+        now = time.perf_counter()
+        if now - last_log >= PROGRESS_SECONDS or done == len(anime_ids):
+            last_log = now
+            rate = done / (now - started)
+            log(f"{done:,}/{len(anime_ids):,} anime  {rate:,.0f}/s  eta {(len(anime_ids) - done) / rate:.0f}s")
+
+    if workers <= 1:
+        for index, chunk in enumerate(chunks):
+            progress(index, chunk_results(chunk, params))
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(chunk_results, chunk, params): index for index, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                progress(futures[future], future.result())
+    return concat_columns({name: [columns[name] for columns in results] for name in COLUMNS})
+
+
+# --- Output ---
+def write_results(path, columns, params):
+    """Write the columns as .npz or .parquet, via a temporary file."""
+    tmp = f"{path}.tmp"
+    if path.endswith(".parquet"):
+        frame = results_frame(columns, engine.LISTS)
+        frame.attrs["params"] = json.dumps(params)
+        frame.to_parquet(tmp, index=False)
+    else:
+        with open(tmp, "wb") as f:
+            np.savez(f, lists=np.array(engine.LISTS), params=np.array(json.dumps(params)), **columns)
+    os.replace(tmp, path)
+
+
+def results_frame(columns, lists):
+    frame = pd.DataFrame(columns)
+    frame["list"] = pd.Categorical.from_codes(frame["list"], categories=list(lists))
+    return frame
+
+
+def read_results(path):
+    """Precomputed recommendations as a DataFrame with a categorical `list` column."""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    with np.load(path) as arrays:
+        return results_frame({name: arrays[name] for name in COLUMNS}, arrays["lists"].tolist())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute recommendations for every anime in the catalog.")
+    parser.add_argument("out", help="output file, .npz or .parquet")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="anime_ids per task")
+    parser.add_argument("--lists", nargs="+", choices=engine.LISTS, default=list(engine.LISTS))
+    parser.add_argument("--n", type=int, default=engine.MAX_RECOMMENDATIONS)
+    parser.add_argument("--weight-user", type=float, default=0.5)
+    parser.add_argument("--include", nargs="*", default=[], help="genres every recommendation must have one of")
+    parser.add_argument("--exclude", nargs="*", default=[], help="genres to leave out")
+    args = parser.parse_args(argv)
+
+    params = dict(include_genres=args.include, exclude_genres=args.exclude, weight_user=args.weight_user,
+                  n=args.n, lists=tuple(args.lists))
+    started = time.perf_counter()
+    columns = precompute(workers=args.workers, chunk_size=args.chunk, **params)
+    write_results(args.out, columns, params)
+    elapsed = time.perf_counter() - started
+    n_anime = len(np.unique(columns["anime_id"]))
+    print(f"{n_anime:,} anime, {len(columns['rec_id']):,} rows in {elapsed:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Background prefetch of synopses/images for recommendation cards.
+
+Requests are queued by priority: every schedule() call gets a newer
+generation than the previous one, and within a call the caller's order
+is kept (visible slide first, then the following slides). An id queued
+again by a newer call moves up to its new place. When MAX_PENDING ids are
+waiting, the least urgent ones (the oldest generations' last slides) are
+dropped to make room, never the newest call's. A small fixed
+pool of daemon threads drains the queue through the shared Jikan client
+into the persistent synopsis cache, so by the time a card is selected
+its synopsis is already local. Only found synopses are stored: a failure
+or a "not found" here would otherwise hide the page's own lookup (and its
+title-search fallback) behind a negative entry. Prefetch requests yield
+to the page's at the Jikan rate limiter.
+"""
+import heapq
+import itertools
+import threading
+
+from anime_recs.jikan import get_client
+from anime_recs.synopsis_cache import get_synopsis_cache, id_key, store_result
+
+MAX_WORKERS = 2
+MAX_PENDING = 500
+
+
+class Prefetcher:
+    def __init__(self, cache, client, max_workers=MAX_WORKERS, max_pending=MAX_PENDING):
+        self.cache = cache
+        self.client = client
+        self.max_pending = max_pending
+        self._heap = []            # [priority, seq, anime_id, live]; replaced or dropped entries go dead
+        self._queued = {}          # anime_id -> its live heap entry
+        self._in_flight = set()
+        self._generation = itertools.count(1)
+        self._seq = itertools.count()
+        self._changed = threading.Condition()
+        self.counters = {"scheduled": 0, "fetched": 0, "failed": 0, "already_cached": 0, "dropped": 0}
+        for i in range(max_workers):
+            threading.Thread(target=self._work, name=f"synopsis-prefetch-{i}", daemon=True).start()
+
+    def schedule(self, anime_ids):
+        """Queue lookups for `anime_ids`, most urgent first, ahead of everything queued before."""
+        generation = next(self._generation)
+        with self._changed:
+            for rank, anime_id in enumerate(anime_ids):
+                anime_id = int(anime_id)
+                priority = (-generation, rank)
+                queued = self._queued.get(anime_id)
+                if anime_id in self._in_flight or (queued is not None and queued[0] <= priority):
+                    continue
+                if queued is not None:
+                    queued[3] = False
+                elif len(self._queued) >= self.max_pending:
+                    # Full: make room by dropping the least urgent id, unless that is this one
+                    worst = max(self._queued.values())
+                    if worst[0] <= priority:
+                        self.counters["dropped"] += 1
+                        continue
+                    worst[3] = False
+                    del self._queued[worst[2]]
+                    self.counters["dropped"] += 1
+                entry = self._queued[anime_id] = [priority, next(self._seq), anime_id, True]
+                heapq.heappush(self._heap, entry)
+                self.counters["scheduled"] += 1
+            if len(self._heap) > 2 * max(self.max_pending, len(self._queued)):
+                self._heap = list(self._queued.values())
+                heapq.heapify(self._heap)
+            self._changed.notify_all()
+
+    def join(self):
+        """Wait until every queued lookup has been done."""
+        with self._changed:
+            self._changed.wait_for(lambda: not self._queued and not self._in_flight)
+
+    def _next(self):
+        with self._changed:
+            while True:
+                self._changed.wait_for(lambda: self._heap)
+                _, _, anime_id, live = heapq.heappop(self._heap)
+                if live:
+                    del self._queued[anime_id]
+                    self._in_flight.add(anime_id)
+                    return anime_id
+
+    def _work(self):
+        while True:
+            anime_id = self._next()
+            try:
+                key = id_key(anime_id)
+                if self.cache.get(key, prefetch=True) is not None:
+                    self.counters["already_cached"] += 1
+                    continue
+                try:
+                    result = self.client.get_description(anime_id, background=True)
+                except Exception:
+                    result = None
+                if result is None:
+                    self.counters["failed"] += 1
+                    continue
+                store_result(self.cache, key, result)
+                self.counters["fetched"] += 1
+            finally:
+                with self._changed:
+                    self._in_flight.discard(anime_id)
+                    self._changed.notify_all()
+
+
+def slide_order(id_lists, current_slides, per_slide):
+    """Interleave several ranked id lists slide by slide, starting at each list's visible slide.
+
+    The visible slide of every list comes first, then the next slide of every
+    list, and so on; slides before the visible one come last.
+    """
+    rounds = []
+    for ids, current in zip(id_lists, current_slides):
+        n_slides = (len(ids) + per_slide - 1) // per_slide
+        order = list(range(current, n_slides)) + list(range(0, min(current, n_slides)))
+        rounds.append([ids[s * per_slide:(s + 1) * per_slide] for s in order])
+
+    ordered, seen = [], set()
+    for slide_group in itertools.zip_longest(*rounds, fillvalue=[]):
+        for batch in slide_group:
+            for anime_id in batch:
+                if anime_id not in seen:
+                    seen.add(anime_id)
+                    ordered.append(anime_id)
+    return ordered
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher(get_synopsis_cache(), get_client())
+    return _prefetcher
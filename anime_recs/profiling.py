@@ -0,0 +1,177 @@
+"""Opt-in profiling of whole page reruns, written as pstats and flamegraph stacks.
+
+Off unless ANIME_RECS_PROFILE is set:
+    ANIME_RECS_PROFILE=all     profile every rerun
+    ANIME_RECS_PROFILE=query   profile the reruns of pages opened with ?profile=1
+    ANIME_RECS_PROFILE_DIR     where profiles go (default CACHE_DIR/profiles)
+    ANIME_RECS_PROFILE_KEEP    how many profiles to keep (default 20); older ones are deleted
+
+Each profiled rerun writes <time>-<page>.pstats (cProfile, deterministic;
+open with `python -m pstats` or snakeviz) and <time>-<page>.folded: stacks
+of the script thread sampled every SAMPLE_INTERVAL seconds, one
+"root;...;leaf count" line per stack, for flamegraph.pl or speedscope.
+
+Pages wrap their body in `with profiling.profile_rerun(...):`, so a rerun
+cut short by st.stop(), st.rerun() or a fast rerun still writes its
+profile, with an "-interrupted" suffix. Streamlit runs every rerun on a
+new thread; a profile whose thread ended without being stopped is closed
+the same way when the next profile starts.
+"""
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from anime_recs.snapshot import CACHE_DIR
+
+PROFILE_MODE = os.environ.get("ANIME_RECS_PROFILE", "").strip().lower()
+PROFILE_DIR = os.environ.get("ANIME_RECS_PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
+PROFILE_KEEP = int(os.environ.get("ANIME_RECS_PROFILE_KEEP", "20"))
+SAMPLE_INTERVAL = 0.005
+SUFFIXES = (".pstats", ".folded")
+
+
+class StackSampler:
+    """Background thread counting the call stacks of one thread, root first."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RerunProfile:
+    def __init__(self, name, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+        self.name = name
+        self.directory = directory
+        self.keep = keep
+        self.profiler = cProfile.Profile()
+        self.thread = threading.current_thread()
+        self.sampler = StackSampler(self.thread.ident)
+        self.started = time.time()
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start both profilers; _NO_PROFILE if another profiler already holds this thread."""
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one profiler at a time (sys.monitoring); e.g. a debugger's
+            _forget(self)
+            return _NO_PROFILE
+        self.sampler.start()
+        return self
+
+    def stop(self, suffix=""):
+        """Stop profiling and write both files (once); returns the path stem, None if already stopped."""
+        with self._lock:
+            if self._stopped:
+                return None
+            self._stopped = True
+        self.profiler.disable()
+        self.sampler.stop()
+        _forget(self)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        stem = os.path.join(self.directory, f"{stamp}-{int(self.started * 1000) % 1000:03d}-{self.name}{suffix}")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self.profiler.dump_stats(stem + ".pstats")
+            with open(stem + ".folded", "w", encoding="utf-8") as f:
+                f.write(self.sampler.folded())
+            prune(self.directory, self.keep)
+        except OSError:
+            pass     # profiling must never break the page
+        return stem
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # st.stop() and reruns end the script with an exception; the profile is still written
+        self.stop(suffix="-interrupted" if exc_type is not None else "")
+        return False
+
+
+class _NoProfile:
+    def stop(self, suffix=""):
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_PROFILE = _NoProfile()
+_active = {}       # thread id -> RerunProfile still running on that thread
+_active_lock = threading.Lock()
+
+
+def _forget(profile):
+    with _active_lock:
+        if _active.get(profile.thread.ident) is profile:
+            del _active[profile.thread.ident]
+
+
+def prune(directory, keep):
+    """Delete all but the newest `keep` profiles (both files of each)."""
+    stems = {}
+    for name in os.listdir(directory):
+        stem, ext = os.path.splitext(name)
+        if ext in SUFFIXES:
+            path = os.path.join(directory, name)
+            stems[stem] = max(stems.get(stem, 0.0), os.path.getmtime(path))
+    for stem in sorted(stems, key=stems.get, reverse=True)[keep:]:
+        for ext in SUFFIXES:
+            try:
+                os.remove(os.path.join(directory, stem + ext))
+            except FileNotFoundError:
+                pass
+
+
+def profile_rerun(name, requested=False):
+    """Start profiling this rerun if profiling is on for it; use it as a context manager around the page body.
+
+    `requested` is whether the page was opened with ?profile=1; it only
+    counts in "query" mode.
+    """
+    if not PROFILE_MODE:
+        return _NO_PROFILE
+    with _active_lock:
+        leftovers = [p for ident, p in _active.items()
+                     if ident == threading.get_ident() or not p.thread.is_alive()]
+    for leftover in leftovers:
+        leftover.stop(suffix="-interrupted")
+    if not (PROFILE_MODE == "all" or (PROFILE_MODE == "query" and requested)):
+        return _NO_PROFILE
+    profile = RerunProfile(name)
+    with _active_lock:
+        _active[threading.get_ident()] = profile
+    return profile.start()
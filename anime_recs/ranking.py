@@ -0,0 +1,21 @@
+"""Partial top-k selection helpers shared by the recommenders."""
+import numpy as np
+
+
+def top_k_stable(scores, k):
+    """Indices of the k highest scores, best first, ties broken by position.
+
+    Uses a partition to find the k-th score instead of sorting everything,
+    then orders only the selected handful.
+    """
+    scores = np.asarray(scores)
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+    kth = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[: k - len(above)]
+    picked = np.concatenate([above, ties])
+    return picked[np.lexsort((picked, -scores[picked]))]
@@ -0,0 +1,82 @@
+"""Process-wide LRU cache of recommendation results, shared by all sessions.
+
+Entries are compact int32 anime_id arrays, not DataFrames; the page turns
+them back into rows with one positional take. Paging through slides and
+repeated popular queries then cost a dictionary lookup instead of a
+re-run of the filters and recommenders.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_ENTRIES = 4096
+
+
+def recommendation_key(anime_id, include_genres, exclude_genres, weight_user=None):
+    """Canonical key: order and duplicates in the genre selections don't matter.
+
+    `anime_id` may also be a collection of seed ids (multi-seed mode), keyed
+    as a sorted tuple.
+    """
+    return (
+        tuple(sorted({int(a) for a in anime_id})) if np.ndim(anime_id) else int(anime_id),
+        tuple(sorted(set(include_genres or ()))),
+        tuple(sorted(set(exclude_genres or ()))),
+        None if weight_user is None else round(float(weight_user), 4),
+    )
+
+
+class LRUCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def get_or_compute(self, key, compute, store=True):
+        """Cached value of `key`, else compute(); `store=False` returns a provisional value without keeping it."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.counters["hits"] += 1
+                return self._data[key]
+            self.counters["misses"] += 1
+        # Computed outside the lock; two sessions racing on one key just both compute it
+        value = compute()
+        if not store:
+            return value
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.counters["evictions"] += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return dict(self.counters, entries=len(self._data),
+                        hit_rate=self.counters["hits"] / lookups if lookups else 0.0)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_rec_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LRUCache()
+    return _cache
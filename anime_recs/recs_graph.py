@@ -0,0 +1,172 @@
+"""CSR storage for the user co-occurrence graph (user_recs_top100.json).
+
+Rows are indexed directly by anime_id: the neighbours of anime `a` are
+``neighbours[offsets[a]:offsets[a + 1]]`` (int32, best first), with optional
+float32 ``weights`` alongside. The arrays live in one binary file that is
+memory-mapped on load, so start-up does no parsing and worker processes
+share the pages through the OS cache.
+
+File layout: 8-byte magic, uint32 header length, JSON header describing
+each array (dtype, length, byte offset), then the raw arrays, 64-byte aligned.
+"""
+import argparse
+import json
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+
+import numpy as np
+
+MAGIC = b"ANIMECSR"
+ALIGN = 64
+
+
+@dataclass(frozen=True)
+class CooccurrenceGraph:
+    offsets: np.ndarray          # int64, len == max_anime_id + 2
+    neighbours: np.ndarray       # int32 neighbour anime_ids, row after row
+    weights: np.ndarray = None   # float32 per neighbour, or None
+
+    def neighbours_of(self, anime_id):
+        """Ranked neighbour ids of `anime_id` (a read-only slice; empty if unknown)."""
+        anime_id = int(anime_id)
+        if anime_id < 0 or anime_id + 1 >= len(self.offsets):
+            return self.neighbours[:0]
+        return self.neighbours[self.offsets[anime_id]:self.offsets[anime_id + 1]]
+
+    def weights_of(self, anime_id):
+        if self.weights is None:
+            return None
+        anime_id = int(anime_id)
+        if anime_id < 0 or anime_id + 1 >= len(self.offsets):
+            return self.weights[:0]
+        return self.weights[self.offsets[anime_id]:self.offsets[anime_id + 1]]
+
+    def __contains__(self, anime_id):
+        return len(self.neighbours_of(anime_id)) > 0
+
+    def seed_ids(self):
+        """anime_ids that have at least one neighbour."""
+        return np.flatnonzero(np.diff(self.offsets))
+
+
+def from_lists(rows, weights=None):
+    """Build a graph from {anime_id: [neighbour ids]} (and optionally matching weight lists)."""
+    size = max(rows, default=-1) + 2
+    lengths = np.zeros(size - 1, dtype=np.int64)
+    for anime_id, ids in rows.items():
+        lengths[anime_id] = len(ids)
+    offsets = np.zeros(size, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    neighbours = np.empty(int(offsets[-1]), dtype=np.int32)
+    w = np.empty(int(offsets[-1]), dtype=np.float32) if weights is not None else None
+    for anime_id, ids in rows.items():
+        start = offsets[anime_id]
+        neighbours[start:start + len(ids)] = ids
+        if w is not None:
+            w[start:start + len(ids)] = weights[anime_id]
+    return CooccurrenceGraph(offsets=offsets, neighbours=neighbours, weights=w)
+
+
+def from_json(json_path):
+    """Parse user_recs_top100.json with the same cleaning rules the app always used."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        raw_recs = json.load(f)
+
+    rows = {}
+    for k, v in raw_recs.items():
+        try:
+            key = int(float(k))
+            rec_ids = [int(x) for x in v if str(x).isdigit()]
+        except (ValueError, TypeError):
+            continue
+        if rec_ids and key >= 0:
+            rows[key] = rec_ids
+    return from_lists(rows)
+
+
+# --- Binary file ---
+def save(graph, path):
+    arrays = {"offsets": graph.offsets, "neighbours": graph.neighbours}
+    if graph.weights is not None:
+        arrays["weights"] = graph.weights
+
+    header = {}
+    position = 0
+    for name, arr in arrays.items():
+        header[name] = {"dtype": arr.dtype.str, "length": len(arr), "offset": position}
+        position += -(-arr.nbytes // ALIGN) * ALIGN
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 4 + len(header_bytes)) // ALIGN) * ALIGN
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".csr-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+            for name, arr in arrays.items():
+                f.seek(data_start + header[name]["offset"])
+                f.write(np.ascontiguousarray(arr).tobytes())
+            f.truncate(data_start + position)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a co-occurrence graph file")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len))
+    data_start = -(-(len(MAGIC) + 4 + header_len) // ALIGN) * ALIGN
+
+    arrays = {}
+    for name, spec in header.items():
+        if spec["length"] == 0:
+            arrays[name] = np.empty(0, dtype=spec["dtype"])
+            continue
+        arrays[name] = np.memmap(path, dtype=spec["dtype"], mode="r",
+                                 offset=data_start + spec["offset"], shape=(spec["length"],))
+    return CooccurrenceGraph(offsets=arrays["offsets"], neighbours=arrays["neighbours"],
+                             weights=arrays.get("weights"))
+
+
+def load_or_convert(json_path, cache_dir, digest):
+    """Memory-map the converted graph for this JSON revision, converting it on first use."""
+    path = os.path.join(cache_dir, "graphs", f"user_recs-{digest}.csr")
+    if os.path.exists(path):
+        try:
+            return load(path)
+        except (OSError, ValueError, KeyError):
+            os.remove(path)
+
+    graph = from_json(json_path)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        save(graph, path)
+        for old in os.listdir(os.path.dirname(path)):
+            if old.startswith("user_recs-") and old != os.path.basename(path):
+                os.remove(os.path.join(os.path.dirname(path), old))
+        return load(path)
+    except OSError:
+        return graph
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert user_recs_top100.json to a CSR graph file.")
+    parser.add_argument("json_path")
+    parser.add_argument("out_path")
+    args = parser.parse_args(argv)
+
+    graph = from_json(args.json_path)
+    save(graph, args.out_path)
+    print(f"{len(graph.seed_ids())} anime, {len(graph.neighbours)} edges -> {args.out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Headless recommendation service: anime_recs.engine behind a small JSON-over-HTTP API.
+
+    python -m anime_recs.service serve --port 8600 --workers 4
+    python -m anime_recs.service loadtest http://127.0.0.1:8600 --requests 5000 --concurrency 16 [--batch 500]
+
+Endpoints (JSON in, JSON out):
+    GET  /health
+    GET  /ids                 every anime_id in the catalog
+    GET  /recommend?anime_id=1&include=Action&exclude=Horror&weight_user=0.5&n=50&lists=hybrid
+    POST /recommend/batch     {"anime_ids": [...], "include": [], "exclude": [], "weight_user": 0.5,
+                               "n": 50, "lists": ["user", "genre", "hybrid"]}
+    POST /recommend/seeds     {"anime_ids": [...], "include": [], "exclude": [], "n": 50}
+
+A result is {"anime_id": 1, "hybrid": {"ids": [...], "scores": [...]}, ...}
+with one entry per requested list; an unknown id gives
+{"anime_id": 1, "error": "unknown anime_id"} without failing the batch.
+
+--workers N loads the catalog (and the item embeddings) once, then
+pre-forks N processes that all accept on the same listening socket. The
+arrays are shared copy-on-write; every process keeps its own result cache.
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from anime_recs import engine
+from anime_recs.data import get_catalog
+
+DEFAULT_PORT = 8600
+MAX_BATCH = 1000
+
+
+class BadRequest(ValueError):
+    pass
+
+
+# --- Request handling ---
+def parse_strings(value, name):
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+        raise BadRequest(f"{name} must be a list of strings")
+    return list(value)
+
+
+def parse_params(get):
+    """Shared query/body parameters; `get(name, default)` reads one value or list."""
+    try:
+        weight_user = float(get("weight_user", 0.5))
+        n = int(get("n", engine.MAX_RECOMMENDATIONS))
+    except (TypeError, ValueError):
+        raise BadRequest("weight_user must be a number and n an integer")
+    lists = tuple(parse_strings(get("lists", engine.LISTS), "lists"))
+    if not 0.0 <= weight_user <= 1.0:
+        raise BadRequest("weight_user must be between 0 and 1")
+    unknown = set(lists) - set(engine.LISTS)
+    if unknown:
+        raise BadRequest(f"unknown lists: {', '.join(sorted(unknown))}")
+    return dict(include_genres=parse_strings(get("include", []), "include"),
+                exclude_genres=parse_strings(get("exclude", []), "exclude"),
+                weight_user=weight_user, n=n, lists=lists)
+
+
+def recommend_json(catalog, anime_id, params):
+    try:
+        results = engine.recommend(catalog, anime_id, **params)
+    except KeyError:
+        return {"anime_id": anime_id, "error": "unknown anime_id"}
+    return {"anime_id": anime_id, **{name: engine.scored_json(*value) for name, value in results.items()}}
+
+
+def parse_ids(values):
+    # bool is an int subclass, but true is not an anime_id
+    if not isinstance(values, list) or not all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        raise BadRequest("anime_ids must be a list of integers")
+    if len(values) > MAX_BATCH:
+        raise BadRequest(f"at most {MAX_BATCH} anime_ids per request")
+    return values
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive, so load tests measure the engine, not TCP setup
+    server_version = "anime-recs"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def respond(self, route):
+        """Run `route`; a BadRequest answers 400 and any other error a JSON 500 instead of a dropped connection."""
+        try:
+            route()
+        except BadRequest as e:
+            self.send_json(400, {"error": str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except Exception:
+            print(f"{self.command} {self.path} failed:", file=sys.stderr)
+            traceback.print_exc()
+            self.close_connection = True
+            self.send_json(500, {"error": "internal server error"})
+
+    def do_GET(self):
+        self.respond(self.route_get)
+
+    def do_POST(self):
+        self.respond(self.route_post)
+
+    def route_get(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        catalog = self.server.catalog
+        if url.path == "/health":
+            self.send_json(200, {"status": "ok", "anime": len(catalog.anime_df), "pid": os.getpid()})
+        elif url.path == "/ids":
+            self.send_json(200, {"anime_ids": catalog.anime_df['anime_id'].tolist()})
+        elif url.path == "/recommend":
+            if "anime_id" not in query:
+                raise BadRequest("anime_id is required")
+            try:
+                anime_id = int(query["anime_id"][0])
+            except ValueError:
+                raise BadRequest("anime_id must be an integer")
+            params = parse_params(lambda name, default: query.get(name, default) if isinstance(default, (list, tuple))
+                                  else query.get(name, [default])[0])
+            self.send_json(200, recommend_json(catalog, anime_id, params))
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def route_post(self):
+        url = urlsplit(self.path)
+        catalog = self.server.catalog
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise BadRequest("body must be JSON")
+        if not isinstance(body, dict):
+            raise BadRequest("body must be a JSON object")
+        ids = parse_ids(body.get("anime_ids", []))
+        params = parse_params(body.get)
+        if url.path == "/recommend/batch":
+            self.send_json(200, {"results": [recommend_json(catalog, a, params) for a in ids]})
+        elif url.path == "/recommend/seeds":
+            rec_ids = engine.get_cached_seed_recs(catalog, ids, params["include_genres"], params["exclude_genres"])
+            self.send_json(200, {"anime_ids": ids, "ids": rec_ids[:max(0, params["n"])].tolist()})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+
+# --- Server ---
+def make_server(catalog, host="127.0.0.1", port=DEFAULT_PORT, verbose=False):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.catalog = catalog
+    server.verbose = verbose
+    return server
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=1, verbose=False):
+    catalog = get_catalog()
+    catalog.embeddings     # build before forking so every worker shares it
+    server = make_server(catalog, host, port, verbose)
+    print(f"serving {len(catalog.anime_df):,} anime on http://{host}:{server.server_port} with {workers} worker(s)")
+    if workers <= 1:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))    # stop the workers too
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+# --- Load test ---
+def loadtest(url, requests=2000, concurrency=8, batch=0, seed=0, log=print):
+    """Hit a running service and report requests/s and latency percentiles."""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    conn.request("GET", "/ids")
+    all_ids = json.loads(conn.getresponse().read())["anime_ids"]
+    conn.close()
+
+    rng = np.random.default_rng(seed)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+    def run(count, thread_seed):
+        local = np.random.default_rng(thread_seed)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        times = []
+        for _ in range(count):
+            if batch:
+                body = json.dumps({"anime_ids": local.choice(all_ids, batch).tolist(), "lists": ["hybrid"]})
+                args = ("POST", "/recommend/batch", body, {"Content-Type": "application/json"})
+            else:
+                args = ("GET", f"/recommend?anime_id={local.choice(all_ids)}&lists=hybrid")
+            started = time.perf_counter()
+            conn.request(*args)
+            response = conn.getresponse()
+            response.read()
+            times.append(time.perf_counter() - started)
+            if response.status != 200:
+                with lock:
+                    errors[0] += 1
+        conn.close()
+        with lock:
+            latencies.extend(times)
+
+    threads = [threading.Thread(target=run, args=(count, int(rng.integers(1 << 31))))
+               for count in per_thread if count]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    ms = np.percentile(np.asarray(latencies) * 1e3, [50, 95, 99]) if latencies else [0.0] * 3
+    summary = {
+        "requests": len(latencies), "errors": errors[0], "seconds": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "anime_per_s": round(len(latencies) * max(batch, 1) / elapsed, 1),
+        "p50_ms": round(ms[0], 2), "p95_ms": round(ms[1], 2), "p99_ms": round(ms[2], 2),
+    }
+    log(json.dumps(summary))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve or load-test the recommendation engine over HTTP.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("serve", help="run the HTTP service")
+    run.add_argument("--host", default="127.0.0.1")
+    run.add_argument("--port", type=int, default=DEFAULT_PORT)
+    run.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    run.add_argument("--verbose", action="store_true", help="log every request")
+    test = sub.add_parser("loadtest", help="measure requests/s against a running service")
+    test.add_argument("url")
+    test.add_argument("--requests", type=int, default=2000)
+    test.add_argument("--concurrency", type=int, default=8)
+    test.add_argument("--batch", type=int, default=0, help="anime_ids per POST /recommend/batch (0 = single GETs)")
+    test.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.host, args.port, workers=args.workers, verbose=args.verbose)
+    else:
+        loadtest(args.url, requests=args.requests, concurrency=args.concurrency, batch=args.batch, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
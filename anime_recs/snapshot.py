@@ -0,0 +1,154 @@
+"""Columnar binary snapshots of cleaned DataFrames, keyed by a hash of the source file.
+
+A snapshot is a directory holding one .npy file per array plus a manifest:
+
+* numeric / bool columns are stored with their dtype as-is;
+* string columns are a UTF-8 blob, code-point offsets and a null mask;
+* list-of-string columns are int32 codes into a per-column vocabulary plus
+  int64 row offsets (the vocabulary itself is a string column).
+
+Loading is a handful of memory-mapped reads, no CSV parsing and no
+ast.literal_eval. The key covers the source file contents and the name of
+the cleaning step, so a new upstream file (or a new SNAPSHOT_VERSION)
+rebuilds automatically.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_VERSION = 1
+CACHE_DIR = os.environ.get(
+    "ANIME_RECS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "anime_recs")
+)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# --- Column encoders ---
+def _write_strings(directory, name, values):
+    is_null = np.array([not isinstance(v, str) for v in values], dtype=bool)
+    texts = ["" if null else v for v, null in zip(values, is_null)]
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in texts], out=offsets[1:])
+    blob = np.frombuffer("".join(texts).encode("utf-8"), dtype=np.uint8)
+    np.save(os.path.join(directory, f"{name}.utf8.npy"), blob)
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+    np.save(os.path.join(directory, f"{name}.null.npy"), is_null)
+
+
+def _read_strings(directory, name):
+    blob = np.load(os.path.join(directory, f"{name}.utf8.npy"), mmap_mode="r")
+    offsets = np.load(os.path.join(directory, f"{name}.offsets.npy")).tolist()
+    is_null = np.load(os.path.join(directory, f"{name}.null.npy")).tolist()
+    text = blob.tobytes().decode("utf-8")
+    return [np.nan if null else text[a:b] for a, b, null in zip(offsets, offsets[1:], is_null)]
+
+
+def _write_lists(directory, name, values):
+    rows = [[str(g) for g in v] if isinstance(v, list) else [] for v in values]
+    vocab = sorted({g for row in rows for g in row})
+    code_of = {g: i for i, g in enumerate(vocab)}
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in rows], out=offsets[1:])
+    codes = np.fromiter((code_of[g] for row in rows for g in row), dtype=np.int32, count=int(offsets[-1]))
+    np.save(os.path.join(directory, f"{name}.codes.npy"), codes)
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+    _write_strings(directory, f"{name}.vocab", vocab)
+
+
+def _read_lists(directory, name):
+    codes = np.load(os.path.join(directory, f"{name}.codes.npy"), mmap_mode="r")
+    offsets = np.load(os.path.join(directory, f"{name}.offsets.npy")).tolist()
+    vocab = np.array(_read_strings(directory, f"{name}.vocab"), dtype=object)
+    flat = vocab[codes].tolist()
+    return [flat[a:b] for a, b in zip(offsets, offsets[1:])]
+
+
+def _column_kind(series):
+    if series.dtype.kind in "biuf":
+        return "array"
+    values = series.tolist()
+    if all(isinstance(v, list) for v in values):
+        return "list"
+    return "string"
+
+
+# --- Snapshot read / write ---
+def write_snapshot(df, directory):
+    os.makedirs(directory, exist_ok=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        name = f"c{i}"
+        kind = _column_kind(df[col])
+        if kind == "array":
+            np.save(os.path.join(directory, f"{name}.npy"), df[col].to_numpy())
+        elif kind == "list":
+            _write_lists(directory, name, df[col].tolist())
+        else:
+            _write_strings(directory, name, [v if isinstance(v, str) or pd.isna(v) else str(v) for v in df[col].tolist()])
+        columns.append({"column": col, "file": name, "kind": kind, "dtype": str(df[col].dtype)})
+    manifest = {"version": SNAPSHOT_VERSION, "rows": len(df), "columns": columns}
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def read_snapshot(directory):
+    with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    data = {}
+    for entry in manifest["columns"]:
+        name, kind = entry["file"], entry["kind"]
+        if kind == "array":
+            data[entry["column"]] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        elif kind == "list":
+            data[entry["column"]] = _read_lists(directory, name)
+        else:
+            strings = _read_strings(directory, name)
+            if entry["dtype"] != "object":
+                strings = pd.Series(strings, dtype=entry["dtype"])
+            data[entry["column"]] = strings
+    return pd.DataFrame(data, index=pd.RangeIndex(manifest["rows"]))
+
+
+def load_snapshot(source_path, build, name, cache_dir=None):
+    """Return build(source_path), served from a snapshot when one matches the source.
+
+    `name` identifies the cleaning step; snapshots of older sources under
+    the same name are removed once a new one has been written.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    key = f"{name}-v{SNAPSHOT_VERSION}-{file_digest(source_path)}"
+    directory = os.path.join(cache_dir, "snapshots", key)
+    if os.path.exists(os.path.join(directory, "manifest.json")):
+        try:
+            return read_snapshot(directory)
+        except (OSError, ValueError, KeyError):
+            shutil.rmtree(directory, ignore_errors=True)
+
+    df = build(source_path)
+    parent = os.path.dirname(directory)
+    tmp = None
+    try:
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f".{key}-", dir=parent)
+        write_snapshot(df, tmp)
+        os.replace(tmp, directory)
+        for old in os.listdir(parent):
+            if old.startswith(f"{name}-v") and old != key:
+                shutil.rmtree(os.path.join(parent, old), ignore_errors=True)
+    except OSError:
+        # A read-only or full disk only costs us the snapshot, not the data
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return df
@@ -0,0 +1,87 @@
+"""Time to first render of a page in a fresh interpreter, as a container restart pays it.
+
+    python -m anime_recs.startup --runs 5
+    python -m anime_recs.startup --data-dir artifacts/ --page "pages/03_Anime Wildcards.py"
+
+Run it from the repository root, as `streamlit run` is. Every run starts
+a new Python process that imports Streamlit and renders the page once
+with streamlit.testing (no browser, no server), so the figures cover
+interpreter start-up, imports, fetching or reading the artifacts, loading
+the catalog and running the script. Whatever is in ANIME_RECS_CACHE_DIR
+and the Hugging Face cache is used as it is: clear them first to time a
+cold container.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+HEAVY_MODULES = ("huggingface_hub", "requests", "scipy", "pyarrow")
+PHASES = ("python_s", "streamlit_import_s", "script_s", "first_render_s")
+
+# Runs in the child; prints one JSON line of absolute timestamps
+PROBE = r"""
+import json, sys, time
+started = time.time()
+from streamlit.testing.v1 import AppTest
+imported = time.time()
+at = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2])).run()
+rendered = time.time()
+print(json.dumps({"started": started, "imported": imported, "rendered": rendered,
+                  "errors": [str(e.value) for e in at.exception],
+                  "modules": [m for m in json.loads(sys.argv[3]) if m in sys.modules]}))
+"""
+
+
+def measure_once(page, timeout=300.0, env=None):
+    """{phase: seconds, "modules": heavy modules the page imported}, from one fresh process."""
+    spawned = time.time()
+    proc = subprocess.run([sys.executable, "-c", PROBE, os.path.abspath(page), str(timeout), json.dumps(HEAVY_MODULES)],
+                          capture_output=True, text=True, env=env)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"rendering {page} failed:\n{proc.stderr.strip()[-2000:]}")
+    probe = json.loads(lines[-1])
+    if probe["errors"]:
+        raise RuntimeError(f"{page} raised: {probe['errors'][0]}")
+    return {
+        "python_s": probe["started"] - spawned,
+        "streamlit_import_s": probe["imported"] - probe["started"],
+        "script_s": probe["rendered"] - probe["imported"],
+        "first_render_s": probe["rendered"] - spawned,
+        "modules": probe["modules"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure a page's time to first render in a fresh process.")
+    parser.add_argument("--page", default="Animerecommender.py")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--data-dir", help="offline mode: read the artifacts from this directory")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds allowed for one render")
+    parser.add_argument("--json", help="also write the runs here")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if args.data_dir:
+        env["ANIME_RECS_DATA_DIR"] = os.path.abspath(args.data_dir)
+    runs = []
+    for i in range(args.runs):
+        runs.append(measure_once(args.page, args.timeout, env))
+        print(f"run {i + 1}: " + "  ".join(f"{phase} {runs[-1][phase]:.2f}" for phase in PHASES))
+
+    print(f"\n{args.page}, median of {len(runs)}:")
+    for phase in PHASES:
+        print(f"  {phase:<20}{np.median([r[phase] for r in runs]):>8.2f}")
+    print(f"  heavy modules imported: {', '.join(runs[-1]['modules']) or 'none'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"page": args.page, "offline": bool(args.data_dir), "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
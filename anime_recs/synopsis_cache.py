@@ -0,0 +1,205 @@
+"""Persistent synopsis/image cache (SQLite) that survives restarts and deploys.
+
+Successful lookups live for `ttl` seconds, failures and "not found"
+answers only for the much shorter `negative_ttl`, so a Jikan outage is
+not remembered for a day. The table is bounded to `max_entries` rows;
+the least recently used rows are evicted first. Hit/miss counters are
+kept per process and exposed through stats(); lookups made with
+prefetch=True (background prefetch, bulk warm-up) are counted apart, so
+hit_rate is the one users see.
+
+Warm the cache from the command line:
+
+    python -m anime_recs.synopsis_cache warm --all        # every catalog anime, by MAL id
+    python -m anime_recs.synopsis_cache warm --top 500    # refresh the most-requested
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+from anime_recs.snapshot import CACHE_DIR
+
+DEFAULT_TTL = 7 * 86400
+NEGATIVE_TTL = 15 * 60
+MAX_ENTRIES = 50_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS synopses (
+    key         TEXT PRIMARY KEY,
+    description TEXT NOT NULL,
+    image_url   TEXT NOT NULL,
+    ok          INTEGER NOT NULL,
+    fetched_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    requests    INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS synopses_accessed ON synopses (accessed_at);
+"""
+
+
+def title_key(title):
+    return f"title:{str(title).strip().lower()}"
+
+
+def id_key(anime_id):
+    return f"id:{int(anime_id)}"
+
+
+class SynopsisCache:
+    def __init__(self, path=None, ttl=DEFAULT_TTL, negative_ttl=NEGATIVE_TTL, max_entries=MAX_ENTRIES):
+        self.path = path or os.path.join(CACHE_DIR, "synopses.sqlite3")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.counters = {"hits": 0, "negative_hits": 0, "misses": 0,
+                         "prefetch_hits": 0, "prefetch_negative_hits": 0, "prefetch_misses": 0,
+                         "stores": 0, "evictions": 0}
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def get(self, key, prefetch=False):
+        """(ok, description, image_url) for a fresh entry, else None."""
+        prefix = "prefetch_" if prefetch else ""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT description, image_url, ok, fetched_at FROM synopses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[3] > (self.ttl if row[2] else self.negative_ttl):
+                self.counters[prefix + "misses"] += 1
+                return None
+            self._db.execute(
+                "UPDATE synopses SET accessed_at = ?, requests = requests + 1 WHERE key = ?", (now, key)
+            )
+            self.counters[prefix + ("hits" if row[2] else "negative_hits")] += 1
+            return bool(row[2]), row[0], row[1]
+
+    def put(self, key, description, image_url, ok=True):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO synopses (key, description, image_url, ok, fetched_at, accessed_at, requests) "
+                "VALUES (?, ?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET description = excluded.description, "
+                "image_url = excluded.image_url, ok = excluded.ok, fetched_at = excluded.fetched_at, "
+                "accessed_at = excluded.accessed_at",
+                (key, description or "", image_url or "", int(ok), now, now),
+            )
+            self.counters["stores"] += 1
+            self._evict()
+
+    def _evict(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM synopses").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM synopses WHERE key IN "
+                "(SELECT key FROM synopses ORDER BY accessed_at LIMIT ?)", (excess,)
+            )
+            self.counters["evictions"] += excess
+
+    def get_or_fetch(self, key, fetch):
+        """Cached (ok, description, image_url), calling fetch() on a miss.
+
+        fetch() returns (description, image_url), None for "not found", or
+        raises; the latter two are stored as short-lived negative entries.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        try:
+            result = fetch()
+        except Exception as e:
+            result = e
+        return store_result(self, key, result)
+
+    def most_requested(self, limit):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key FROM synopses ORDER BY requests DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM synopses").fetchone()
+        lookups = self.counters["hits"] + self.counters["negative_hits"] + self.counters["misses"]
+        hit_rate = (self.counters["hits"] + self.counters["negative_hits"]) / lookups if lookups else 0.0
+        return dict(self.counters, entries=entries, hit_rate=hit_rate)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_synopsis_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SynopsisCache()
+    return _cache
+
+
+def store_result(cache, key, result):
+    """Store a client lookup result (tuple, None or exception); returns (ok, description, image_url)."""
+    if isinstance(result, Exception):
+        entry = (False, f"Error fetching description: {str(result)}", "")
+    elif result is None:
+        entry = (False, "No description found.", "")
+    else:
+        entry = (True, result[0], result[1])
+    cache.put(key, entry[1], entry[2], ok=entry[0])
+    return entry
+
+
+# --- Bulk warm-up ---
+def warm(cache, keys, client, refresh=False, batch_size=64):
+    """Fetch every "id:<mal_id>" / "title:<title>" key that is missing (or all, with refresh)."""
+    todo = [k for k in keys if refresh or cache.get(k, prefetch=True) is None]
+
+    def lookup(key):
+        kind, value = key.split(":", 1)
+        return client.get_description(int(value)) if kind == "id" else client.search_description(value)
+
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        for key, result in zip(batch, client.fetch_many(batch, lookup=lookup)):
+            store_result(cache, key, result)
+        print(f"warmed {min(start + batch_size, len(todo))}/{len(todo)}", flush=True)
+    return cache.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the persistent synopsis cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    warm_parser = sub.add_parser("warm", help="Fill the cache from Jikan")
+    which = warm_parser.add_mutually_exclusive_group(required=True)
+    which.add_argument("--all", action="store_true", help="every anime in the catalog")
+    which.add_argument("--top", type=int, metavar="N", help="refresh the N most-requested entries")
+    sub.add_parser("stats", help="Print cache statistics")
+    args = parser.parse_args(argv)
+
+    cache = get_synopsis_cache()
+    if args.command == "stats":
+        print(cache.stats())
+        return
+
+    from anime_recs.jikan import get_client
+    if args.all:
+        from anime_recs.data import get_catalog
+        keys = [id_key(a) for a in get_catalog().anime_df['anime_id'].tolist()]
+        print(warm(cache, keys, get_client()))
+    else:
+        print(warm(cache, cache.most_requested(args.top), get_client(), refresh=True))
+
+
+if __name__ == "__main__":
+    main()
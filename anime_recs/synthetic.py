@@ -0,0 +1,198 @@
+"""Synthetic data in the same shape as the real artifacts, for offline builds and checks.
+
+    python -m anime_recs.synthetic ratings out.csv --users 50000 --items 17000
+    python -m anime_recs.synthetic catalog meta.csv user_recs.json --items 1000000
+"""
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_ratings(n_users, n_items, ratings_per_user=40, n_clusters=25, seed=0,
+                      chunk_users=20_000, anime_ids=None):
+    """Yield DataFrames of (user_id, anime_id, rating), one chunk of users at a time.
+
+    Items have Zipf-like popularity and belong to taste clusters; each user
+    mostly rates items from one cluster and rates those higher, so the
+    co-occurrence graph has real structure to find.
+    """
+    rng = np.random.default_rng(seed)
+    anime_ids = np.arange(1, n_items + 1) if anime_ids is None else np.asarray(anime_ids)
+    popularity = 1.0 / np.arange(1, n_items + 1) ** 0.8
+    cdf = np.cumsum(rng.permutation(popularity / popularity.sum()))
+    cluster_of = rng.integers(0, n_clusters, n_items)
+    by_cluster = np.argsort(cluster_of, kind="stable")
+    cluster_start = np.searchsorted(cluster_of[by_cluster], np.arange(n_clusters + 1))
+    cluster_size = np.diff(cluster_start)
+
+    for start in range(0, n_users, chunk_users):
+        users = np.arange(start, min(start + chunk_users, n_users))
+        counts = np.maximum(1, rng.poisson(ratings_per_user, len(users)))
+        favourite = rng.choice(np.flatnonzero(cluster_size), len(users))
+        n_own = (counts * 0.6).astype(np.int64)
+
+        # In-cluster picks: uniform within the user's favourite cluster
+        own_user = np.repeat(users, n_own)
+        own_fav = np.repeat(favourite, n_own)
+        own_items = by_cluster[cluster_start[own_fav] + (rng.random(len(own_fav)) * cluster_size[own_fav]).astype(np.int64)]
+        # The rest: drawn from global popularity
+        other_user = np.repeat(users, counts - n_own)
+        other_items = np.minimum(np.searchsorted(cdf, rng.random(len(other_user))), n_items - 1)
+
+        user_col = np.concatenate([own_user, other_user])
+        item_col = np.concatenate([own_items, other_items])
+        liked = np.concatenate([np.ones(len(own_user), bool), np.zeros(len(other_user), bool)])
+        # One rating per (user, item); duplicates from sampling with replacement are dropped
+        _, first = np.unique(user_col * n_items + item_col, return_index=True)
+        user_col, item_col, liked = user_col[first], item_col[first], liked[first]
+        ratings = np.where(liked, rng.integers(6, 11, len(first)), rng.integers(1, 11, len(first)))
+        yield pd.DataFrame({
+            "user_id": user_col,
+            "anime_id": anime_ids[item_col],
+            "rating": ratings.astype(np.int8),
+        })
+
+
+def write_synthetic_ratings(path, n_users, n_items, **kwargs):
+    for i, chunk in enumerate(synthetic_ratings(n_users, n_items, **kwargs)):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+
+
+GENRES = ['Action', 'Adventure', 'Avant Garde', 'Award Winning', 'Boys Love', 'Comedy', 'Drama', 'Ecchi',
+          'Fantasy', 'Girls Love', 'Gourmet', 'Horror', 'Mystery', 'Romance', 'Sci-Fi', 'Slice of Life',
+          'Sports', 'Supernatural', 'Suspense']
+N_THEMES = 60
+TYPES = ['TV', 'Movie', 'OVA', 'ONA', 'Special', 'Music']
+TITLE_WORDS = ['Sword', 'Star', 'Dragon', 'Academy', 'Night', 'Spirit', 'Blue', 'Hero', 'Garden', 'Steel',
+               'Moon', 'Record', 'Journey', 'Festival', 'Ghost', 'Summer', 'Kingdom', 'Signal', 'Café', 'Zero']
+
+
+def synthetic_catalog(n_items, n_clusters=None, seed=0):
+    """(metadata DataFrame, cluster of each row) shaped like cleaned_anime_metadata_filtered.csv.
+
+    anime_ids are sparse and increasing like MyAnimeList ids; genres and
+    themes are stored as list literals and mostly follow the row's cluster.
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = n_clusters or max(25, n_items // 500)
+    anime_ids = np.sort(rng.choice(np.arange(1, 3 * n_items + 1), n_items, replace=False))
+    clusters = rng.integers(0, n_clusters, n_items)
+    cluster_genres = rng.integers(0, len(GENRES), (n_clusters, 3))
+    cluster_themes = rng.integers(0, N_THEMES, (n_clusters, 4))
+
+    n_genres = rng.integers(0, 5, n_items)
+    extra_genres = rng.integers(0, len(GENRES), (n_items, 2))
+    n_themes = rng.integers(0, 5, n_items)
+    extra_theme = rng.integers(0, N_THEMES, n_items)
+
+    genres, themes = [], []
+    for row in range(n_items):
+        own = cluster_genres[clusters[row]].tolist() + extra_genres[row].tolist()
+        genres.append(str(sorted({GENRES[g] for g in own[:n_genres[row]]})))
+        own = cluster_themes[clusters[row]].tolist()[:n_themes[row]] + [extra_theme[row]]
+        themes.append(str(sorted({f"Theme {t}" for t in own})))
+
+    words = np.asarray(TITLE_WORDS)[rng.integers(0, len(TITLE_WORDS), (n_items, 2))]
+    titles = pd.Series(words[:, 0]) + " " + pd.Series(words[:, 1]) + " " + pd.Series(np.arange(n_items)).astype(str)
+    alternative = pd.Series(np.where(rng.random(n_items) < 0.5, "", "Alt " + titles))
+    ids = pd.Series(anime_ids).astype(str)
+    df = pd.DataFrame({
+        "anime_id": anime_ids,
+        "title": titles,
+        "alternative_title": alternative,
+        "genres": genres,
+        "genres_detailed": themes,
+        "score": np.where(rng.random(n_items) < 0.05, np.nan, np.round(rng.normal(6.8, 0.9, n_items).clip(1, 10), 2)),
+        "image_url": "https://cdn.myanimelist.net/images/anime/" + ids + ".jpg",
+        "type": np.asarray(TYPES)[rng.integers(0, len(TYPES), n_items)],
+        "year": pd.array(np.where(rng.random(n_items) < 0.03, np.nan, rng.integers(1960, 2026, n_items)),
+                         dtype="Int64"),
+        "episodes": np.where(rng.random(n_items) < 0.05, "Unknown", rng.integers(1, 53, n_items).astype(str)),
+        "mal_url": "https://myanimelist.net/anime/" + ids,
+        "sequel": np.where(rng.random(n_items) < 0.8, "", "Sequel of " + titles),
+    })
+    return df, clusters
+
+
+def synthetic_neighbours(clusters, k=100, coverage=0.85, in_cluster=0.7, seed=0, chunk_rows=50_000):
+    """Yield (rows, neighbour rows, lengths) chunks: ranked top-k lists like user_recs_top100.json.
+
+    A `coverage` share of the rows gets a list; neighbours come mostly from
+    the row's own cluster, the rest from Zipf-like global popularity.
+    """
+    rng = np.random.default_rng(seed)
+    n_items = len(clusters)
+    popularity = 1.0 / np.arange(1, n_items + 1) ** 0.8
+    cdf = np.cumsum(rng.permutation(popularity / popularity.sum()))
+    by_cluster = np.argsort(clusters, kind="stable")
+    cluster_start = np.searchsorted(clusters[by_cluster], np.arange(clusters.max() + 2))
+    cluster_size = np.diff(cluster_start)
+    covered = np.flatnonzero(rng.random(n_items) < coverage)
+    draws = k + k // 4 + 1
+
+    for start in range(0, len(covered), chunk_rows):
+        rows = covered[start:start + chunk_rows]
+        own = rng.random((len(rows), draws)) < in_cluster
+        cluster = clusters[rows][:, None]
+        offset = (rng.random((len(rows), draws)) * cluster_size[cluster]).astype(np.int64)
+        candidates = np.where(own, by_cluster[cluster_start[cluster] + offset],
+                              np.minimum(np.searchsorted(cdf, rng.random((len(rows), draws))), n_items - 1))
+        # Drop the row itself and repeated draws, keeping the first k in draw order
+        order = np.argsort(candidates, axis=1, kind="stable")
+        ordered = np.take_along_axis(candidates, order, axis=1)
+        repeat = np.zeros_like(ordered, dtype=bool)
+        repeat[:, 1:] = ordered[:, 1:] == ordered[:, :-1]
+        valid = np.empty_like(repeat)
+        np.put_along_axis(valid, order, ~repeat, axis=1)
+        valid &= candidates != rows[:, None]
+        keep = np.argsort(~valid, axis=1, kind="stable")[:, :k]
+        lengths = np.minimum(valid.sum(axis=1), k)
+        yield rows, np.take_along_axis(candidates, keep, axis=1), lengths
+
+
+def write_synthetic_catalog(meta_path, recs_path, n_items, neighbours=100, coverage=0.85, seed=0):
+    """Write a metadata CSV and a co-occurrence JSON ({"anime_id": [anime_id, ...]}) for n_items anime."""
+    df, clusters = synthetic_catalog(n_items, seed=seed)
+    df.to_csv(meta_path, index=False)
+    anime_ids = df["anime_id"].to_numpy()
+    with open(recs_path, "w", encoding="utf-8") as f:
+        f.write("{")
+        first = True
+        for rows, lists, lengths in synthetic_neighbours(clusters, k=neighbours, coverage=coverage, seed=seed + 1):
+            ids = anime_ids[lists]
+            parts = [f'"{anime_ids[row]}":{json.dumps(ids[i, :lengths[i]].tolist())}' for i, row in enumerate(rows)]
+            f.write(("" if first else ",") + ",".join(parts))
+            first = False
+        f.write("}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic data files.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ratings = sub.add_parser("ratings", help="user animelist ratings CSV (user_id, anime_id, rating)")
+    ratings.add_argument("out_path")
+    ratings.add_argument("--users", type=int, default=50_000)
+    ratings.add_argument("--items", type=int, default=17_000)
+    ratings.add_argument("--per-user", type=int, default=40)
+    ratings.add_argument("--seed", type=int, default=0)
+    catalog = sub.add_parser("catalog", help="metadata CSV and co-occurrence JSON in the shape of the app's inputs")
+    catalog.add_argument("meta_path")
+    catalog.add_argument("recs_path")
+    catalog.add_argument("--items", type=int, default=17_000)
+    catalog.add_argument("--neighbours", type=int, default=100)
+    catalog.add_argument("--coverage", type=float, default=0.85, help="share of anime with a neighbour list")
+    catalog.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "ratings":
+        write_synthetic_ratings(args.out_path, args.users, args.items,
+                                ratings_per_user=args.per_user, seed=args.seed)
+    else:
+        write_synthetic_catalog(args.meta_path, args.recs_path, args.items, neighbours=args.neighbours,
+                                coverage=args.coverage, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
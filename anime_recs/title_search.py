@@ -0,0 +1,130 @@
+"""Typeahead search over `title` and `alternative_title`.
+
+Two structures, both built once per catalog:
+
+* a sorted list of normalised name keys (every name, plus every word
+  suffix of it, so "titan" finds "Attack on Titan"); a prefix query is a
+  binary search for the key range, which is what a trie walk would give;
+* a trigram inverted index (CSR arrays) for fuzzy matches when the
+  prefix range is too small, scored by trigram Jaccard similarity.
+
+search() returns ranked anime_ids: exact name, then name prefix, then
+word prefix, then fuzzy; ties go to the primary title, the higher score
+and the shorter name.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+from anime_recs.ranking import top_k_stable
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+MIN_FUZZY_SIMILARITY = 0.3
+
+
+def normalise(text):
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM.sub(" ", text.casefold()).strip()
+
+
+def trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleSearchIndex:
+    def __init__(self, anime_ids, titles, alternative_titles=None, scores=None):
+        anime_ids = np.asarray(anime_ids, dtype=np.int64)
+        n = len(anime_ids)
+        alternative_titles = alternative_titles if alternative_titles is not None else [""] * n
+        scores = np.nan_to_num(np.asarray(scores if scores is not None else np.zeros(n), dtype=np.float64))
+
+        # One entry per distinct (anime, normalised name)
+        names, entry_row, entry_primary = [], [], []
+        for row, (title, alt) in enumerate(zip(titles, alternative_titles)):
+            seen = set()
+            for name, primary in ((normalise(title), True), (normalise(alt) if isinstance(alt, str) else "", False)):
+                if name and name not in seen:
+                    seen.add(name)
+                    names.append(name)
+                    entry_row.append(row)
+                    entry_primary.append(primary)
+        self.anime_ids = anime_ids
+        self.names = names
+        self.entry_row = np.asarray(entry_row, dtype=np.int32)
+        self.entry_primary = np.asarray(entry_primary, dtype=bool)
+        self.entry_len = np.fromiter((len(x) for x in names), dtype=np.int32, count=len(names))
+        self.entry_score = scores[self.entry_row] if len(names) else np.zeros(0)
+
+        # Prefix keys: the whole name (kind 0) and each later word suffix (kind 1)
+        keys = []
+        for entry, name in enumerate(names):
+            keys.append((name, entry, 0))
+            for match in re.finditer(r" (?=\S)", name):
+                keys.append((name[match.end():], entry, 1))
+        keys.sort()
+        self.keys = [k[0] for k in keys]
+        self.key_entry = np.fromiter((k[1] for k in keys), dtype=np.int32, count=len(keys))
+        self.key_kind = np.fromiter((k[2] for k in keys), dtype=np.int8, count=len(keys))
+
+        # Trigram postings as CSR: trigram id -> entry ids
+        vocab, pairs_tri, pairs_entry = {}, [], []
+        self.entry_ntri = np.zeros(len(names), dtype=np.int32)
+        for entry, name in enumerate(names):
+            grams = trigrams(name)
+            self.entry_ntri[entry] = len(grams)
+            for g in grams:
+                pairs_tri.append(vocab.setdefault(g, len(vocab)))
+                pairs_entry.append(entry)
+        pairs_tri = np.asarray(pairs_tri, dtype=np.int32)
+        order = np.argsort(pairs_tri, kind="stable")
+        self.trigram_id = vocab
+        self.postings = np.asarray(pairs_entry, dtype=np.int32)[order]
+        self.posting_offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs_tri, minlength=len(vocab)), out=self.posting_offsets[1:])
+
+    def _prefix_matches(self, query):
+        lo = bisect_left(self.keys, query)
+        hi = bisect_left(self.keys, query + "\x7f", lo)
+        entries = self.key_entry[lo:hi]
+        kinds = self.key_kind[lo:hi].astype(np.int64)
+        # Exact names outrank prefixes; kind 0 = starts the name, 1 = starts a later word
+        kinds = np.where((kinds == 0) & (self.entry_len[entries] == len(query)), -1, kinds)
+        return entries, kinds
+
+    def _fuzzy_matches(self, query, limit):
+        grams = [self.trigram_id[g] for g in trigrams(query) if g in self.trigram_id]
+        if not grams:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        hits = np.concatenate([self.postings[self.posting_offsets[g]:self.posting_offsets[g + 1]] for g in grams])
+        shared = np.bincount(hits, minlength=len(self.names))
+        candidates = np.flatnonzero(shared)
+        common = shared[candidates]
+        similarity = common / (len(trigrams(query)) + self.entry_ntri[candidates] - common)
+        keep = similarity >= MIN_FUZZY_SIMILARITY
+        candidates, similarity = candidates[keep], similarity[keep]
+        top = top_k_stable(similarity, limit * 4)
+        return candidates[top], similarity[top]
+
+    def search(self, query, limit=20):
+        """Top `limit` anime_ids for a (partial) title, best first."""
+        query = normalise(query)
+        if not query:
+            return []
+        entries, kinds = self._prefix_matches(query)
+        if len(entries) < limit:
+            fuzzy, similarity = self._fuzzy_matches(query, limit)
+            entries = np.concatenate([entries, fuzzy])
+            kinds = np.concatenate([kinds, 2 + (1 - similarity)])
+        if len(entries) == 0:
+            return []
+
+        # Rank, then keep each anime's best entry
+        order = np.lexsort((self.entry_len[entries], -self.entry_score[entries],
+                            ~self.entry_primary[entries], kinds))
+        rows = self.entry_row[entries[order]]
+        _, first = np.unique(rows, return_index=True)
+        best_rows = rows[np.sort(first)][:limit]
+        return self.anime_ids[best_rows].tolist()
@@ -0,0 +1,366 @@
+"""Incremental updates of the user co-occurrence graph from rating deltas.
+
+    python -m anime_recs.build_cooccurrence rating.csv user_recs_top100.json --state-dir state/
+    python -m anime_recs.update_cooccurrence state/ new_ratings.csv user_recs_top100.json \\
+        --csr user_recs.csr
+
+The delta CSV has the same user_id, anime_id, rating columns as the full
+ratings file and is applied as an upsert: a row replaces that user's
+previous rating of that anime, and a rating below the build's --min-rating
+removes the like. Only the users in the delta are touched:
+
+1. Their old and new liked sets give ``dC = New.T @ New - Old.T @ Old``,
+   which is added to the stored pair counts (diagonal = like counts).
+2. Anime with a non-zero row in dC are re-ranked. For cosine/lift/pmi so
+   are the anime that co-occur with one whose like count changed.
+3. Every other anime keeps its neighbours and weights. Lift and pmi depend
+   on the number of users only through a common factor, so the state keeps
+   them as of ``meta["weights_n_users"]`` and the factor for the current
+   user count is applied when the graph is written out.
+
+The result is the graph a full rebuild on the merged ratings would give.
+Only the touched rows of the pair counts and of the graph are recomputed;
+they are spliced into the stored arrays, whose untouched rows are copied
+as whole runs.
+
+Memory: the stored arrays are memory-mapped and the new user and pair
+arrays are written straight into memory-mapped files beside them, so an
+update holds the delta plus O(users + anime) index arrays and the top-K
+graph, not the pair matrix. I/O: every update still rewrites each state
+file sequentially (its untouched runs are copied through the page cache),
+so an update of a gigabyte pair matrix writes a gigabyte.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from anime_recs import recs_graph
+from anime_recs.build_cooccurrence import BLOCK_ITEMS, CHUNK_ROWS, normalise, top_k_rows
+
+
+# --- State ---
+STATE_ARRAYS = ("users", "user_indptr", "user_items", "item_users", "pairs_indptr", "pairs_indices", "pairs_data")
+
+
+def load_state(state_dir):
+    """Everything save_state wrote, memory-mapped: an update only pages in the rows it reads."""
+    with open(os.path.join(state_dir, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    state = {name: np.load(os.path.join(state_dir, f"{name}.npy"), mmap_mode="r") for name in STATE_ARRAYS}
+    return dict(state, meta=meta, graph=recs_graph.load(os.path.join(state_dir, "graph.csr")))
+
+
+class StagedState:
+    """New state files written next to the old ones, which stay readable until commit() swaps them in."""
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self._names = []
+        self._arrays = []
+
+    def _tmp(self, name):
+        return os.path.join(self.state_dir, f".{name}.tmp")
+
+    def array(self, name, length, dtype):
+        """A memory-mapped `name`.npy to fill in place."""
+        self._names.append(f"{name}.npy")
+        array = np.lib.format.open_memmap(self._tmp(f"{name}.npy"), mode="w+", dtype=dtype, shape=(length,))
+        self._arrays.append(array)
+        return array
+
+    def save(self, name, value):
+        self._names.append(f"{name}.npy")
+        with open(self._tmp(f"{name}.npy"), "wb") as f:
+            np.save(f, value)
+
+    def commit(self, graph, meta):
+        for array in self._arrays:
+            array.flush()
+        for name in self._names:
+            os.replace(self._tmp(name), os.path.join(self.state_dir, name))
+        recs_graph.save(graph, os.path.join(self.state_dir, "graph.csr"))
+        with open(self._tmp("meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(self._tmp("meta.json"), os.path.join(self.state_dir, "meta.json"))
+
+
+def _segments(starts, lengths):
+    """Flat indices of the slices [start, start + length) one after another."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    shift = np.repeat(np.asarray(starts, dtype=np.int64) - (np.cumsum(lengths) - lengths), lengths)
+    return shift + np.arange(total)
+
+
+def _in_memory(i, length, dtype):
+    return np.empty(length, dtype=dtype)
+
+
+def _splice_rows(source, indptr, arrays, row_indptr, row_arrays, alloc=_in_memory):
+    """CSR whose row r is stored row source[r], or new row -1 - source[r] where that is negative.
+
+    (indptr, arrays) is the stored CSR, usually memory-mapped, and
+    (row_indptr, row_arrays) the new rows; alloc(i, length, dtype) gives
+    the output for arrays[i]. A run of consecutive stored rows is copied
+    as one slice, so the Python work follows the number of new rows.
+    """
+    source = np.asarray(source, dtype=np.int64)
+    new = source < 0
+    lengths = np.empty(len(source), dtype=np.int64)
+    lengths[~new] = np.diff(indptr)[source[~new]]
+    lengths[new] = np.diff(row_indptr)[-1 - source[new]]
+    out_indptr = np.zeros(len(source) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=out_indptr[1:])
+    out = [alloc(i, int(out_indptr[-1]), a.dtype) for i, a in enumerate(arrays)]
+
+    breaks = np.ones(len(source), dtype=bool)
+    breaks[1:] = new[1:] | new[:-1] | (np.diff(source) != 1)
+    starts = np.flatnonzero(breaks)
+    for lo, hi in zip(starts.tolist(), np.append(starts[1:], len(source)).tolist()):
+        if new[lo]:
+            k = -1 - int(source[lo])
+            src, begin, end = row_arrays, row_indptr[k], row_indptr[k + 1]
+        else:
+            src, begin, end = arrays, indptr[source[lo]], indptr[source[hi - 1] + 1]
+        for o, a in zip(out, src):
+            o[out_indptr[lo]:out_indptr[hi]] = a[begin:end]
+    return out_indptr, out
+
+
+def _replace_rows(n_rows, rows, indptr, arrays, row_indptr, row_arrays, alloc=_in_memory):
+    """_splice_rows over `n_rows` rows (the stored ones, then empty ones) with the sorted `rows` replaced."""
+    indptr = np.concatenate([indptr, np.full(max(0, n_rows + 1 - len(indptr)), indptr[-1], dtype=np.int64)])
+    source = np.arange(n_rows, dtype=np.int64)
+    source[rows] = -1 - np.arange(len(rows))
+    return _splice_rows(source, indptr, arrays, row_indptr, row_arrays, alloc)
+
+
+def _csr_rows(lists, dtype=np.int32):
+    """(indptr, values) of a list of id lists."""
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(ids) for ids in lists], out=indptr[1:])
+    values = np.fromiter((v for ids in lists for v in ids), dtype=dtype, count=int(indptr[-1]))
+    return indptr, values
+
+
+def pair_rows(indptr, indices, data, rows, size):
+    """Just `rows` of a pair-count CSR as a scipy matrix, reading only those rows of the arrays."""
+    import scipy.sparse as sp
+
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = np.asarray(indptr[rows], dtype=np.int64)
+    lengths = np.asarray(indptr[rows + 1], dtype=np.int64) - starts
+    take = _segments(starts, lengths)
+    sub_indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=sub_indptr[1:])
+    return sp.csr_matrix((np.asarray(data[take]), np.asarray(indices[take]), sub_indptr), shape=(len(rows), size))
+
+
+# --- Delta ---
+def read_delta(delta_path, min_rating, chunksize=CHUNK_ROWS):
+    """{user_id: ({anime_id liked}, {anime_id no longer liked})}, last row per pair wins."""
+    reader = pd.read_csv(delta_path, usecols=["user_id", "anime_id", "rating"], chunksize=chunksize,
+                         dtype={"user_id": np.int64, "anime_id": np.int64, "rating": np.float32})
+    frame = pd.concat(list(reader), ignore_index=True)
+    frame = frame.drop_duplicates(["user_id", "anime_id"], keep="last")
+    liked = frame["rating"].to_numpy() >= min_rating
+    changes = {}
+    for user_id, anime_id, like in zip(frame["user_id"].tolist(), frame["anime_id"].tolist(), liked.tolist()):
+        added, removed = changes.setdefault(user_id, (set(), set()))
+        (added if like else removed).add(anime_id)
+    return changes
+
+
+def apply_delta(state, changes, staged):
+    """Write the users CSR with the changed users' liked sets merged in; returns (old, new) lists, n_users."""
+    users, indptr, items = state["users"], state["user_indptr"], state["user_items"]
+    changed = np.array(sorted(changes), dtype=np.int64)
+    where = np.searchsorted(users, changed)
+    known = (where < len(users)) & (users[np.minimum(where, len(users) - 1)] == changed) if len(users) else \
+        np.zeros(len(changed), dtype=bool)
+
+    old_lists, new_lists = [], []
+    for user_id, pos, is_known in zip(changed.tolist(), where.tolist(), known.tolist()):
+        old = items[indptr[pos]:indptr[pos + 1]].tolist() if is_known else []
+        added, removed = changes[user_id]
+        old_lists.append(old)
+        new_lists.append(sorted((set(old) - removed) | added))
+
+    # Users who no longer like anything leave the matrix, as a full build would not see them
+    keep = np.ones(len(users), dtype=bool)
+    keep[where[known]] = False
+    fresh = [ids for ids in new_lists if ids]
+    fresh_users = changed[np.array([bool(ids) for ids in new_lists], dtype=bool)]
+    all_users = np.concatenate([users[keep], fresh_users])
+    order = np.argsort(all_users, kind="stable")
+    source = np.concatenate([np.flatnonzero(keep), -1 - np.arange(len(fresh))])[order]
+
+    row_indptr, row_items = _csr_rows(fresh)
+    user_indptr, _ = _splice_rows(source, indptr, (items,), row_indptr, (row_items,),
+                                  alloc=lambda i, length, dtype: staged.array("user_items", length, np.int32))
+    staged.save("users", all_users[order])
+    staged.save("user_indptr", user_indptr)
+    return old_lists, new_lists, len(order)
+
+
+def pair_delta(old_lists, new_lists, size):
+    """dC = New.T @ New - Old.T @ Old over the changed users only (int32 CSR, size x size)."""
+    import scipy.sparse as sp
+
+    def liked_matrix(lists):
+        lengths = [len(ids) for ids in lists]
+        cols = np.concatenate([np.asarray(ids, dtype=np.int64) for ids in lists] or [np.empty(0, np.int64)])
+        indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        return sp.csr_matrix((np.ones(len(cols), dtype=np.int32), cols, indptr), shape=(len(lists), size))
+
+    old, new = liked_matrix(old_lists), liked_matrix(new_lists)
+    delta = (new.T @ new - old.T @ old).tocsr()
+    delta.eliminate_zeros()
+    return delta
+
+
+# --- Re-ranking ---
+def rerank(rows_of, rows, item_users, n_users, similarity, top_k, min_count, block_items=BLOCK_ITEMS):
+    """Top-K {anime_id: ids}, {anime_id: scores} for `rows`, as the full build would rank them.
+
+    rows_of(rows) gives those rows of the pair counts as a CSR.
+    """
+    neighbours, weights = {}, {}
+    for start in range(0, len(rows), block_items):
+        block_rows = rows[start:start + block_items]
+        sub = rows_of(block_rows)
+        cols = np.unique(sub.indices)            # only co-liked anime can score above -inf
+        if len(cols) == 0:
+            continue
+        local = np.searchsorted(cols, block_rows)
+        has_row = (local < len(cols)) & (cols[np.minimum(local, len(cols) - 1)] == block_rows)
+        block_rows, local, sub = block_rows[has_row], local[has_row], sub[has_row]
+
+        counts = np.zeros((len(block_rows), len(cols)), dtype=np.float32)
+        coo = sub.tocoo()
+        counts[coo.row, np.searchsorted(cols, coo.col)] = coo.data
+        counts[np.arange(len(block_rows)), local] = 0          # an anime is not its own neighbour
+        scores = normalise(counts, local, item_users[cols].astype(np.float64), n_users, similarity)
+        scores = np.where(counts >= min_count, scores, -np.inf)
+        best = top_k_rows(scores, top_k)
+        best_scores = np.take_along_axis(scores, best, axis=1).astype(np.float32)
+        for anime_id, row_cols, row_scores in zip(block_rows.tolist(), best, best_scores):
+            keep = np.isfinite(row_scores)
+            if keep.any():
+                neighbours[anime_id] = cols[row_cols[keep]].tolist()
+                weights[anime_id] = row_scores[keep].tolist()
+    return neighbours, weights
+
+
+def reweight(weights, similarity, n_from, n_to):
+    """lift/pmi weights scored with `n_from` users, as `n_to` users would score them (ranks are unaffected)."""
+    if weights is None or similarity not in ("lift", "pmi") or n_from == n_to:
+        return weights
+    if similarity == "lift":
+        return (weights * np.float32(n_to / n_from)).astype(np.float32)
+    return (weights + np.float32(np.log(n_to / n_from))).astype(np.float32)
+
+
+def write_graph_json(graph, path):
+    """The app's JSON artifact straight from the CSR rows, as write_json would format it."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i, anime_id in enumerate(graph.seed_ids().tolist()):
+            ids = ", ".join(map(str, graph.neighbours_of(anime_id).tolist()))
+            f.write(f'{", " if i else ""}"{anime_id}": [{ids}]')
+        f.write("}")
+    os.replace(tmp, path)
+
+
+# --- Driver ---
+def update(state_dir, delta_path, out_path, csr_path=None, chunksize=CHUNK_ROWS, block_items=BLOCK_ITEMS,
+           log=print):
+    """Apply the ratings in `delta_path` to the state and return the updated graph."""
+    started = time.perf_counter()
+    state = load_state(state_dir)
+    meta = state["meta"]
+    if meta["min_count"] < 1:
+        raise ValueError("incremental updates need a build with --min-count >= 1")
+    staged = StagedState(state_dir)
+
+    changes = read_delta(delta_path, meta["min_rating"], chunksize=chunksize)
+    old_lists, new_lists, n_users = apply_delta(state, changes, staged)
+    log(f"delta: {len(changes):,} users")
+
+    indptr, indices, data = state["pairs_indptr"], state["pairs_indices"], state["pairs_data"]
+    size = max([len(indptr) - 1] + [max(ids) + 1 for ids in new_lists if ids])
+    # Anime new to the state start as empty rows
+    indptr = np.concatenate([indptr, np.full(size + 1 - len(indptr), indptr[-1], dtype=np.int64)])
+    delta = pair_delta(old_lists, new_lists, size)
+    touched = np.flatnonzero(np.diff(delta.indptr))
+    patched = pair_rows(indptr, indices, data, touched, size)
+    patched = (patched + delta[touched]).tocsr()
+    patched.eliminate_zeros()
+    patched.sort_indices()
+    indptr, (indices, data) = _replace_rows(
+        size, touched, indptr, (indices, data), patched.indptr, (patched.indices, patched.data),
+        alloc=lambda i, length, dtype: staged.array(("pairs_indices", "pairs_data")[i], length, dtype))
+    staged.save("pairs_indptr", indptr)
+    item_users = np.zeros(size, dtype=np.int64)
+    item_users[:len(state["item_users"])] = state["item_users"]
+    item_users += delta.diagonal().astype(np.int64)
+    staged.save("item_users", item_users)
+
+    def rows_of(rows):
+        return pair_rows(indptr, indices, data, rows, size)
+
+    similarity = meta["similarity"]
+    affected = touched
+    if similarity != "count":
+        changed_items = np.flatnonzero(delta.diagonal())
+        affected = np.union1d(affected, rows_of(changed_items).indices)
+    log(f"re-ranking {len(affected):,} anime")
+    fresh, fresh_weights = rerank(rows_of, affected, item_users, n_users, similarity,
+                                  meta["top_k"], meta["min_count"], block_items=block_items)
+
+    # Stored weights stay scored with weights_n_users; re-ranked rows are brought to that scale
+    weights_n_users = meta.get("weights_n_users", meta["n_users"])
+    row_indptr, row_neighbours = _csr_rows([fresh.get(a, []) for a in affected.tolist()])
+    _, row_weights = _csr_rows([fresh_weights.get(a, []) for a in affected.tolist()], dtype=np.float32)
+    row_weights = reweight(row_weights, similarity, n_users, weights_n_users)
+
+    graph = state["graph"]
+    n_rows = max(len(graph.offsets) - 1, int(affected.max()) + 1 if len(affected) else 0)
+    offsets, (neighbours, weights) = _replace_rows(n_rows, affected, graph.offsets, (graph.neighbours, graph.weights),
+                                                   row_indptr, (row_neighbours, row_weights))
+    staged.commit(recs_graph.CooccurrenceGraph(offsets=offsets, neighbours=neighbours, weights=weights),
+                  dict(meta, n_users=n_users, weights_n_users=weights_n_users))
+
+    graph = recs_graph.CooccurrenceGraph(offsets=offsets, neighbours=neighbours,
+                                         weights=reweight(weights, similarity, weights_n_users, n_users))
+    write_graph_json(graph, out_path)
+    if csr_path:
+        recs_graph.save(graph, csr_path)
+    log(f"wrote {len(graph.seed_ids()):,} anime to {out_path} in {time.perf_counter() - started:.1f}s")
+    return graph
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply new ratings to a co-occurrence graph built with --state-dir.")
+    parser.add_argument("state_dir", help="directory written by build_cooccurrence --state-dir")
+    parser.add_argument("delta_path", help="CSV with user_id, anime_id, rating rows to add or replace")
+    parser.add_argument("out_path", help="JSON artifact consumed by the app")
+    parser.add_argument("--csr", dest="csr_path", help="also write the memory-mappable CSR graph here")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--block-items", type=int, default=BLOCK_ITEMS)
+    args = parser.parse_args(argv)
+
+    update(args.state_dir, args.delta_path, args.out_path, csr_path=args.csr_path,
+           chunksize=args.chunksize, block_items=args.block_items)
+
+
+if __name__ == "__main__":
+    main()
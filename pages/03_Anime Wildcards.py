@@ -1,257 +1,190 @@
+import numpy as np
 import streamlit as st
-import json
-from huggingface_hub import hf_hub_download
+from anime_recs import metrics, profiling
+from anime_recs.cards import card_html, card_parts, meta_html, slide_html, stylesheet_html
+from anime_recs.data import get_catalog, get_discover_data, get_discover_table
+from anime_recs.discover import SORT_KEYS
 
 # --- CONFIG ---
 ITEMS_PER_SLIDE = 5
+MAX_ITEMS = 50
+SORT_LABELS = {
+    "score": "Score",
+    "mean_rating": "Mean user rating",
+    "std_rating": "Rating disagreement (σ)",
+    "rating_count": "Number of ratings",
+}
 
 # --- Page config ---
 st.set_page_config(page_title="Discover Hidden Gems", layout="wide")
-
-# --- Reuse EXACT SAME CSS from main app ---
-st.markdown("""
-<style>
-.stApp {
-    background-color: #0D0D0D;
-    color: #FFFFFF;
-}
-.stSelectbox label, .stMultiSelect label, .stSlider label {
-    color: #CCCCCC !important;
-    font-weight: 500;
-}
-h2, h3 {
-    color: #FFDD57;
-}
-.stButton>button {
-    background-color: #FFD700;
-    color: #0D0D0D;
-    font-weight: bold;
-    margin: 5px;
-}
-div[data-testid="stExpander"] details summary {
-    color: #FFDD57 !important;
-    font-weight: 600 !important;
-    font-size: 16px !important;
-}
-div[data-testid="stExpander"] div[data-testid="stExpanderContent"] {
-    background-color: #1A1A1A !important;
-    border-radius: 10px !important;
-    padding: 15px !important;
-}
-.genre-tag {
-    display: inline-block;
-    background-color: #444444;
-    color: #CCCCCC;
-    font-size: 9px;
-    padding: 2px 6px;
-    border-radius: 10px;
-    margin: 2px 2px;
-    white-space: nowrap;
-}
-.anime-card {
-    background-color: #3A3A3A;
-    border-radius: 12px;
-    padding: 10px;
-    text-align: center;
-    display: flex;
-    flex-direction: column;
-    align-items: center;
-    justify-content: flex-start;
-    height: 420px;
-    width: 160px;
-    flex-shrink: 0;
-    box-shadow: 0 2px 6 0 rgba(0,0,0,0.3);
-    overflow-y: auto;
-    position: relative;
-    transition: transform 0.2s;
-}
-.anime-card:hover {
-    transform: translateY(-3px);
-    box-shadow: 0 4px 10px rgba(255,215,0,0.3);
-}
-.card-number {
-    position: absolute;
-    top: 8px;
-    right: 8px;
-    background-color: #FFD700;
-    color: #0D0D0D;
-    font-weight: bold;
-    font-size: 11px;
-    width: 22px;
-    height: 22px;
-    border-radius: 50%;
-    display: flex;
-    align-items: center;
-    justify-content: center;
-    z-index: 10;
-}
-.anime-card img {
-    width: 100%;
-    height: 200px;
-    object-fit: cover;
-    border-radius: 8px;
-    margin-bottom: 6px;
-}
-.anime-card h4 {
-    color: #FFD700;
-    font-size: 12px;
-    font-weight: bold;
-    margin: 0 0 4px;
-    line-height: 1.3;
-    display: -webkit-box;
-    -webkit-line-clamp: 2;
-    -webkit-box-orient: vertical;
-    overflow: hidden;
-}
-.anime-card .meta-info {
-    font-size: 10px;
-    color: #AAAAAA;
-    margin: 2px 0;
-    line-height: 1.3;
-}
-.anime-card .score {
-    color: #FF8C00;
-    font-size: 11px;
-    font-weight: bold;
-    margin: 4px 0;
-}
-.anime-card a {
-    text-decoration: none;
-    color: inherit;
-    width: 100%;
-    height: 100%;
-}
-.center-container {
-    display: flex;
-    justify-content: center;
-    width: 100%;
-    margin: 20px 0;
-}
-.slide-container {
-    display: flex;
-    flex-direction: row;
-    gap: 12px;
-    justify-content: flex-start;
-    padding: 10px 0;
-    margin: 10px 0;
-    overflow-x: auto;
-    -webkit-overflow-scrolling: touch;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# --- Helper: Format genres as tags ---
-def format_genres_as_tags(genres_list):
-    if not isinstance(genres_list, list): return "N/A"
-    tags = []
-    for g in genres_list[:5]:
-        g_clean = str(g).strip()
-        tags.append(f'<span class="genre-tag">{g_clean}</span>')
-    return " ".join(tags) if tags else "N/A"
-
-# --- Load discover.json from Hugging Face ---
-@st.cache_resource
-def load_discover_data():
-    HF_REPO_ID = "nigenghanei-a11y/Anime_recommender"
-    HF_REPO_TYPE = "dataset"
-    discover_path = hf_hub_download(
-        repo_id=HF_REPO_ID,
-        filename="discover.json",
-        repo_type=HF_REPO_TYPE
+metrics.start_sinks()
+rerun_span = metrics.span("wildcards.rerun")
+with profiling.profile_rerun("wildcards", requested=st.query_params.get("profile") == "1"):
+    # --- Same stylesheet and card renderer as the main app ---
+    st.html(stylesheet_html())
+
+    # --- Load data ---
+    # The stats table answers tunable queries; without anime_stats.csv it is None and the page
+    # falls back to the fixed lists
+    try:
+        with metrics.span("load_data"):
+            catalog = get_catalog()
+            discover_table = get_discover_table()
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        st.stop()
+
+    if discover_table is None:
+        try:
+            discover_data = get_discover_data()
+            hidden_gems = discover_data.get("hidden_gems", [])
+            polarizing_anime = discover_data.get("polarizing_anime", [])
+        except Exception as e:
+            st.error(f"❌ Failed to load discovery data: {str(e)}")
+            st.stop()
+
+    def stats_extra(std_rating=None, rating_count=None):
+        """The σ line of polarizing anime, else the rating-count line."""
+        if std_rating is not None:
+            return meta_html(f"σ: {std_rating:.2f}")
+        if rating_count is not None:
+            return meta_html(f"👥 {int(rating_count):,}")
+        return ""
+
+    def table_slides(positions, show_std):
+        """Slide renderer over catalog positions, with the stats table's score and σ or rating count."""
+        def render(start, stop):
+            visible = positions[start:stop]
+            scores = ["N/A" if np.isnan(score) else f"{score:.2f}" for score in discover_table.score[visible].tolist()]
+            if show_std:
+                extras = [stats_extra(std_rating=v) for v in discover_table.std_rating[visible].tolist()]
+            else:
+                extras = [stats_extra(rating_count=v) for v in discover_table.rating_count[visible].tolist()]
+            return catalog.cards.slide_html(visible, start=start + 1, extras=extras, scores=scores)
+        return render
+
+    def list_slides(items):
+        """Slide renderer over the fixed discover.json cards."""
+        def render(start, stop):
+            return slide_html(card_html(card_parts(item), number, stats_extra(item.get('std_rating'), item.get('rating_count')))
+                              for number, item in enumerate(items[start:stop], start=start + 1))
+        return render
+
+    def reset_slide_on_change(slide_key, query):
+        """Start again from the first slide whenever the query behind a slideshow changes."""
+        if st.session_state.get(f"{slide_key}_query") != query:
+            st.session_state[f"{slide_key}_query"] = query
+            st.session_state[slide_key] = 0
+
+    # --- Slideshow component ---
+    def show_discover_slideshow(total_items, render_slide, slide_key, title):
+        if not total_items:
+            st.write("No items to display.")
+            return
+
+        total_slides = (total_items + ITEMS_PER_SLIDE - 1) // ITEMS_PER_SLIDE
+        current_slide = st.session_state.get(slide_key, 0)
+        if current_slide >= total_slides:
+            current_slide = 0
+            st.session_state[slide_key] = 0
+
+        st.subheader(f"🔹 {title} (Top {min(50, total_items)})")
+
+        start_idx = current_slide * ITEMS_PER_SLIDE
+        with metrics.span("render_cards"):
+            st.html(render_slide(start_idx, start_idx + ITEMS_PER_SLIDE))
+
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Previous", key=f"prev_{slide_key}"):
+                st.session_state[slide_key] = max(0, current_slide - 1)
+                st.rerun()
+        with col3:
+            if st.button("Next ➡️", key=f"next_{slide_key}"):
+                st.session_state[slide_key] = min(total_slides - 1, current_slide + 1)
+                st.rerun()
+
+    # --- Session state ---
+    for key in ["hidden_slide", "polar_slide"]:
+        if key not in st.session_state:
+            st.session_state[key] = 0
+
+    # --- UI ---
+    st.title("🔍 Discover Hidden Gems & Polarizing Anime")
+
+    if discover_table is None:
+        st.markdown("### 💎 Hidden Gems")
+        st.write("Highly rated (≥8.0) but rated by fewer than 5,000 users — overlooked masterpieces!")
+        show_discover_slideshow(len(hidden_gems[:MAX_ITEMS]), list_slides(hidden_gems), "hidden_slide", "Hidden Gems")
+
+        st.markdown("---")
+
+        st.markdown("### ⚡ Polarizing Anime")
+        st.write("Anime with high rating disagreement (σ ≥ 2.0, ≥100 ratings)")
+        show_discover_slideshow(len(polarizing_anime[:MAX_ITEMS]), list_slides(polarizing_anime), "polar_slide", "Polarizing Anime")
+        st.stop()
+
+    # --- Sidebar filters (shared by both lists) ---
+    st.sidebar.subheader("Filters")
+    all_genres = catalog.genre_index.vocab
+    include_genres = st.sidebar.multiselect("Include genres", all_genres)
+    exclude_genres = st.sidebar.multiselect("Exclude genres", all_genres)
+    all_types = list(discover_table.type_vocab)
+    selected_types = st.sidebar.multiselect("Types", all_types, default=all_types)
+    valid_years = catalog.anime_df['year_numeric'].dropna()
+    min_year, max_year = (int(valid_years.min()), int(valid_years.max())) if not valid_years.empty else (1900, 2025)
+    selected_years = st.sidebar.slider("Year range", min_year, max_year, (min_year, max_year))
+
+    genre_rows = catalog.genre_index.filter_mask(include_genres, exclude_genres)
+    common = dict(
+        types=None if len(selected_types) == len(all_types) else selected_types,
+        # Anime without a year stay in until the range is narrowed
+        year_range=None if selected_years == (min_year, max_year) else selected_years,
+        rows=genre_rows,
     )
-    with open(discover_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-# --- Load data ---
-try:
-    discover_data = load_discover_data()
-    hidden_gems = discover_data.get("hidden_gems", [])
-    polarizing_anime = discover_data.get("polarizing_anime", [])
-except Exception as e:
-    st.error(f"❌ Failed to load discovery data: {str(e)}")
-    st.stop()
-
-# --- Slideshow component ---
-def show_discover_slideshow(items, slide_key, title):
-    if not items:
-        st.write("No items to display.")
-        return
-
-    total_items = len(items)
-    total_slides = (total_items + ITEMS_PER_SLIDE - 1) // ITEMS_PER_SLIDE
-    current_slide = st.session_state.get(slide_key, 0)
-    if current_slide >= total_slides:
-        current_slide = 0
-        st.session_state[slide_key] = 0
-
-    st.subheader(f"🔹 {title} (Top {min(50, total_items)})")
-
-    start_idx = current_slide * ITEMS_PER_SLIDE
-    batch = items[start_idx : start_idx + ITEMS_PER_SLIDE]
-
-    cards_html = ""
-    for idx, item in enumerate(batch, start=start_idx + 1):
-        title_clean = str(item.get('title', 'Unknown')).replace('"', '&quot;')
-        score = item.get('score', 'N/A')
-        img_url = item.get('image_url', '') or "https://via.placeholder.com/160x200?text=No+Image"
-        genre_tags = format_genres_as_tags(item.get('genres', []))
-        mal_url = item.get('mal_url', '#')
-        
-        anime_type = item.get('type', 'N/A')
-        year = item.get('year', 'N/A')
-        episodes = item.get('episodes', 'N/A')
-        sequel = str(item.get('sequel', 'N/A'))
-        sequel_display = sequel[:20] + "..." if len(sequel) > 20 else sequel
-
-        extra_info = ""
-        if "std_rating" in item:
-            extra_info = f"<div class=\"meta-info\">σ: {item['std_rating']:.2f}</div>"
-        elif "rating_count" in item:
-            extra_info = f"<div class=\"meta-info\">👥 {int(item['rating_count']):,}</div>"
-
-        cards_html += f'''
-        <a href="{mal_url}" target="_blank" rel="noopener noreferrer">
-        <div class="anime-card">
-            <div class="card-number">{idx}</div>
-            <img src="{img_url}" onerror="this.src=&quot;https://via.placeholder.com/160x200?text=No+Image&quot;">
-            <h4>{title_clean}</h4>
-            <div>{genre_tags}</div>
-            <div class="meta-info">Type: {anime_type}</div>
-            <div class="meta-info">Year: {year}</div>
-            <div class="meta-info">Episodes: {episodes}</div>
-            <div class="meta-info">Sequel: {sequel_display}</div>
-            {extra_info}
-            <div class="score">Score: {score}</div>
-        </div>
-        </a>
-        '''
-
-    st.html(f'<div class="slide-container">{cards_html}</div>')
-
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col1:
-        if st.button("⬅️ Previous", key=f"prev_{slide_key}"):
-            st.session_state[slide_key] = max(0, current_slide - 1)
-            st.rerun()
-    with col3:
-        if st.button("Next ➡️", key=f"next_{slide_key}"):
-            st.session_state[slide_key] = min(total_slides - 1, current_slide + 1)
-            st.rerun()
-
-# --- Session state ---
-for key in ["hidden_slide", "polar_slide"]:
-    if key not in st.session_state:
-        st.session_state[key] = 0
-
-# --- UI ---
-st.title("🔍 Discover Hidden Gems & Polarizing Anime")
-
-st.markdown("### 💎 Hidden Gems")
-st.write("Highly rated (≥8.0) but rated by fewer than 5,000 users — overlooked masterpieces!")
-show_discover_slideshow(hidden_gems[:50], "hidden_slide", "Hidden Gems")
-
-st.markdown("---")
-
-st.markdown("### ⚡ Polarizing Anime")
-st.write("Anime with high rating disagreement (σ ≥ 2.0, ≥100 ratings)")
-show_discover_slideshow(polarizing_anime[:50], "polar_slide", "Polarizing Anime")
\ No newline at end of file
+    filter_key = (tuple(include_genres), tuple(exclude_genres), tuple(selected_types), selected_years)
+
+    def sort_controls(prefix, default):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            sort_by = st.selectbox("Sort by", SORT_KEYS, index=SORT_KEYS.index(default),
+                                   format_func=SORT_LABELS.get, key=f"{prefix}_sort")
+        with col2:
+            ascending = st.checkbox("Ascending", key=f"{prefix}_ascending")
+        return sort_by, ascending
+
+    st.markdown("### 💎 Hidden Gems")
+    with st.expander("⚙️ Tune Hidden Gems"):
+        col1, col2 = st.columns(2)
+        with col1:
+            gem_min_score = st.slider("Minimum score", 0.0, 10.0, 8.0, 0.1, key="gem_min_score")
+        with col2:
+            gem_max_ratings = st.number_input("Rated by fewer than", min_value=1, value=5000, step=500,
+                                              key="gem_max_ratings")
+        gem_sort, gem_ascending = sort_controls("gem", "score")
+    st.write(f"Highly rated (≥{gem_min_score:.1f}) but rated by fewer than {gem_max_ratings:,} users — overlooked masterpieces!")
+    with metrics.span("discover_query"):
+        gem_mask = discover_table.select(min_score=gem_min_score, max_ratings=gem_max_ratings, **common)
+        gem_positions = discover_table.top(gem_mask, gem_sort, gem_ascending, MAX_ITEMS)
+    reset_slide_on_change("hidden_slide", (gem_min_score, gem_max_ratings, gem_sort, gem_ascending, filter_key))
+    show_discover_slideshow(len(gem_positions), table_slides(gem_positions, show_std=False), "hidden_slide", "Hidden Gems")
+
+    st.markdown("---")
+
+    st.markdown("### ⚡ Polarizing Anime")
+    with st.expander("⚙️ Tune Polarizing Anime"):
+        col1, col2 = st.columns(2)
+        with col1:
+            polar_min_std = st.slider("Minimum σ", 0.0, 5.0, 2.0, 0.1, key="polar_min_std")
+        with col2:
+            polar_min_ratings = st.number_input("At least this many ratings", min_value=1, value=100, step=50,
+                                                key="polar_min_ratings")
+        polar_sort, polar_ascending = sort_controls("polar", "std_rating")
+    st.write(f"Anime with high rating disagreement (σ ≥ {polar_min_std:.1f}, ≥{polar_min_ratings:,} ratings)")
+    with metrics.span("discover_query"):
+        polar_mask = discover_table.select(min_std=polar_min_std, min_ratings=polar_min_ratings, **common)
+        polar_positions = discover_table.top(polar_mask, polar_sort, polar_ascending, MAX_ITEMS)
+    reset_slide_on_change("polar_slide", (polar_min_std, polar_min_ratings, polar_sort, polar_ascending, filter_key))
+    show_discover_slideshow(len(polar_positions), table_slides(polar_positions, show_std=True), "polar_slide", "Polarizing Anime")
+
+    rerun_span.stop()
@@ -99,6 +99,7 @@ We compute **real-world co-occurrence** from high-quality user behavior:
   `score(B) = number of users who rated both A and B with rating ≥ 7`
 - Due to **scale** (millions of ratings), we used a **10% random sample** of high-rated interactions for feasibility.
 - Returns **top 50** anime by co-occurrence frequency.
+- Anime missing from the graph (or whose neighbours are filtered out) are filled with their **nearest neighbours in a 64-dimensional item embedding** — a truncated SVD of the co-occurrence graph and genre tags — instead of random titles. The embedding is built in the background when the data loads; until it is ready, the gaps are filled with the anime sharing the most genres.
 
 #### 2. **Genre-Based Content Filtering**
 Relevance is driven purely by **genre alignment**:
@@ -110,14 +111,21 @@ Relevance is driven purely by **genre alignment**:
 - ⚠️ **No popularity-based fallback** is used, as our dataset does not include a `members` column.
 
 #### 3. **Hybrid Recommendation Score**
-Combines signals via **probabilistic interleaving**:
+Combines signals via **weighted reciprocal-rank fusion**:
 - Merges user-based and genre-based ranked lists.
-- At each step, selects next item:
-  - With probability `w` → from user-based list  
-  - With probability `1 - w` → from genre-based list
-- Preserves ranking quality from both sources without score normalization.
+- Each anime scores:  
+  `hybrid(X) = w / (60 + rank_user(X)) + (1 - w) / (60 + rank_genre(X))`  
+  (a list that does not contain X contributes nothing)
+- `w` is the slider value; anime ranked well by **both** lists rise to the top.
+- Uses ranks only, so no score normalization is needed, and the same inputs always give the same list.
 - Delivers **diverse, balanced** recommendations that respect both **community taste** and **content similarity**.
 
+#### 4. **Several Favourites (Multi-Seed)**
+Pick several anime you liked and get **one blended list**:
+- Every favourite's co-occurrence list votes for its neighbours:  
+  `seeds(X) = Σ over favourites 1 / (60 + rank_favourite(X))`
+- Anime liked alongside **several** of your favourites rise to the top; the favourites themselves are never recommended.
+
 > 🔒 **Note**: All strategies respect user-applied filters and are **capped at 50 recommendations** for clarity and performance.
 
 ---
@@ -134,7 +142,7 @@ Beyond standard recommendations, our system surfaces two unique curated lists:
 - **Definition**: Anime with **high rating variance (σ ≥ 2.0)**, based on **at least 100 ratings**.  
 - **Purpose**: Highlights titles that inspire **strongly divided opinions** — perfect for bold, discussion-worthy experiences.
 
-> These features are precomputed for performance and accessible via the **“Discover”** page.
+> Per-anime rating statistics are precomputed in one pass; the thresholds above are the defaults on the **“Discover”** page, where they can be tuned together with genre, type and year filters and the sort order.
 
 ---
 
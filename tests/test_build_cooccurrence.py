@@ -0,0 +1,97 @@
+"""build_cooccurrence against a brute-force count on synthetic ratings, for every similarity."""
+import itertools
+import math
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("scipy")
+
+from anime_recs import build_cooccurrence
+from anime_recs.synthetic import synthetic_ratings
+
+MIN_RATING = 7
+TOP_K = 8
+
+
+@pytest.fixture(scope="module")
+def ratings_path(tmp_path_factory):
+    ratings = pd.concat(synthetic_ratings(300, 40, ratings_per_user=12, n_clusters=4, seed=3, chunk_users=100))
+    # Shuffled, with some re-ratings: a user's anime must still count once
+    ratings = pd.concat([ratings, ratings.sample(200, random_state=1)]).sample(frac=1.0, random_state=2)
+    path = tmp_path_factory.mktemp("ratings") / "rating.csv"
+    ratings.to_csv(path, index=False)
+    return str(path)
+
+
+def brute_force(ratings_path, similarity):
+    """{anime_id: {neighbour: score}} over every pair liked by at least one common user."""
+    ratings = pd.read_csv(ratings_path)
+    liked = ratings[ratings["rating"] >= MIN_RATING]
+    by_user = liked.groupby("user_id")["anime_id"].apply(lambda s: sorted(set(s)))
+    n_users = len(by_user)
+    n_item = Counter(a for items in by_user for a in items)
+    counts = Counter(pair for items in by_user for pair in itertools.permutations(items, 2))
+
+    scores = defaultdict(dict)
+    for (a, b), count in counts.items():
+        if similarity == "count":
+            score = count
+        elif similarity == "cosine":
+            score = count / math.sqrt(n_item[a] * n_item[b])
+        else:
+            score = count * n_users / (n_item[a] * n_item[b])
+            if similarity == "pmi":
+                score = math.log(score)
+        scores[a][b] = score
+    return scores
+
+
+@pytest.mark.parametrize("similarity", build_cooccurrence.SIMILARITIES)
+def test_matches_brute_force(ratings_path, tmp_path, similarity):
+    neighbours, weights = build_cooccurrence.build(
+        ratings_path, str(tmp_path / "recs.json"), min_rating=MIN_RATING, top_k=TOP_K, similarity=similarity,
+        workers=2, block_items=16, pairs_per_bucket=500, log=lambda *a: None)
+    expected = brute_force(ratings_path, similarity)
+
+    assert set(neighbours) == set(expected)
+    for anime_id, row in expected.items():
+        # Best first, ties broken by the lower anime_id
+        best = sorted(row.items(), key=lambda kv: (-kv[1], kv[0]))[:TOP_K]
+        assert weights[anime_id] == pytest.approx([score for _, score in best], rel=1e-5)
+        for neighbour, score in zip(neighbours[anime_id], weights[anime_id]):
+            assert row[neighbour] == pytest.approx(score, rel=1e-5)
+        if similarity == "count":
+            assert neighbours[anime_id] == [b for b, _ in best]
+
+
+def test_bucket_size_does_not_change_the_matrix(ratings_path, tmp_path):
+    results = []
+    for pairs_per_bucket in (97, 10_000):
+        work = tmp_path / str(pairs_per_bucket)
+        work.mkdir()
+        build_cooccurrence.spill_liked_pairs(ratings_path, str(work), MIN_RATING, log=lambda *a: None)
+        shape = build_cooccurrence.build_user_item(str(work), pairs_per_bucket=pairs_per_bucket)
+        arrays = {name: np.load(work / f"{name}.npy")
+                  for name in ("users", "item_users", "csr_indptr", "csr_indices", "csc_indptr", "csc_indices")}
+        results.append((shape, arrays))
+
+    (shape_a, a), (shape_b, b) = results
+    assert shape_a == shape_b
+    for name in a:
+        np.testing.assert_array_equal(a[name], b[name])
+    # The CSC is the transpose of the CSR
+    rows = np.repeat(np.arange(shape_a[0]), np.diff(a["csr_indptr"]))
+    csr_pairs = set(zip(rows.tolist(), a["csr_indices"].tolist()))
+    cols = np.repeat(np.arange(shape_a[1]), np.diff(a["csc_indptr"]))
+    assert csr_pairs == set(zip(a["csc_indices"].tolist(), cols.tolist()))
+
+
+def test_no_liked_ratings(tmp_path):
+    path = tmp_path / "rating.csv"
+    pd.DataFrame({"user_id": [1, 2], "anime_id": [5, 6], "rating": [3, 4]}).to_csv(path, index=False)
+    neighbours, _ = build_cooccurrence.build(str(path), str(tmp_path / "recs.json"), workers=1,
+                                             log=lambda *a: None)
+    assert neighbours == {}
@@ -0,0 +1,31 @@
+"""The optional anime_stats.csv artifact: its absence is found once and cached."""
+import pytest
+
+from anime_recs import data
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(data, "_cache", {})
+
+
+def test_missing_stats_file_offline(tmp_path, monkeypatch, fresh_cache):
+    monkeypatch.setattr(data, "DATA_DIR", str(tmp_path))
+    assert data.get_discover_table() is None
+    assert data._cache["discover_table"] is None
+
+
+def test_unpublished_stats_file_is_not_downloaded_again(monkeypatch, fresh_cache):
+    errors = pytest.importorskip("huggingface_hub.errors")
+    calls = []
+
+    def download(filename):
+        calls.append(filename)
+        raise errors.EntryNotFoundError(f"{filename} is not in the dataset")
+
+    monkeypatch.setattr(data, "DATA_DIR", None)
+    monkeypatch.setattr(data, "download", download)
+    assert data.get_discover_table() is None
+    tries = calls.count(data.ANIME_STATS_FILE)
+    assert data.get_discover_table() is None
+    assert calls.count(data.ANIME_STATS_FILE) == tries
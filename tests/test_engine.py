@@ -0,0 +1,73 @@
+"""Padding while the item embeddings are still being built, and once they are ready."""
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from anime_recs import engine, rec_cache
+from anime_recs.data import load_catalog
+from anime_recs.synthetic import write_synthetic_catalog
+
+
+@pytest.fixture(scope="module")
+def built(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("engine")
+    write_synthetic_catalog(tmp / "meta.csv", tmp / "recs.json", 400, neighbours=10, coverage=0.7)
+    catalog = load_catalog(str(tmp / "meta.csv"), str(tmp / "recs.json"), cache_dir=str(tmp / "cache"))
+    return catalog, catalog.embeddings
+
+
+@pytest.fixture
+def catalog(built, monkeypatch):
+    catalog, embeddings = built
+    pending = Future()
+    monkeypatch.setitem(catalog.__dict__, "_embeddings", pending)
+    monkeypatch.setattr(rec_cache, "_cache", rec_cache.LRUCache())
+    return catalog, pending, embeddings
+
+
+def cold_anime(catalog):
+    ids = catalog.anime_df["anime_id"].to_numpy()
+    return int(next(a for a in ids if a not in catalog.user_recs))
+
+
+def test_pads_by_genre_until_the_embeddings_are_ready(catalog):
+    catalog, pending, embeddings = catalog
+    anime_id = cold_anime(catalog)
+    allowed = np.ones(len(catalog.anime_df), dtype=bool)
+
+    rows = engine.user_based_rows(catalog, anime_id, allowed)
+    position = catalog.id_index.position(anime_id)
+    genres = catalog.anime_df.at[position, "genres"]
+    allowed[position] = False
+    assert rows.tolist() == engine.genre_based_rows(catalog, genres, allowed, anime_id).tolist()
+
+    pending.set_result(embeddings)
+    padded = engine.user_based_rows(catalog, anime_id, np.ones(len(catalog.anime_df), dtype=bool))
+    assert padded.tolist() == embeddings.nearest(position, engine.MAX_RECOMMENDATIONS, allowed=allowed).tolist()
+
+
+def test_provisional_results_are_not_cached(catalog):
+    catalog, pending, embeddings = catalog
+    anime_id = cold_anime(catalog)
+    cache = rec_cache.get_rec_cache()
+
+    user_ids, genre_ids = engine.get_cached_recs(catalog, anime_id, [], [])
+    engine.get_cached_hybrid_recs(anime_id, [], [], user_ids, genre_ids, 0.5)
+    engine.get_cached_seed_recs(catalog, [anime_id], [], [])
+    assert cache.stats()["entries"] == 0
+
+    pending.set_result(embeddings)
+    user_ids, genre_ids = engine.get_cached_recs(catalog, anime_id, [], [])
+    engine.get_cached_hybrid_recs(anime_id, [], [], user_ids, genre_ids, 0.5)
+    engine.get_cached_seed_recs(catalog, [anime_id], [], [])
+    assert cache.stats()["entries"] == 3
+
+
+def test_unknown_anime_id_raises(catalog):
+    catalog, _, _ = catalog
+    allowed = np.ones(len(catalog.anime_df), dtype=bool)
+    missing = int(catalog.anime_df["anime_id"].max()) + 1
+    with pytest.raises(KeyError):
+        engine.user_based_rows(catalog, missing, allowed)
+    assert allowed.all()
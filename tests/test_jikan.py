@@ -0,0 +1,109 @@
+"""JikanClient against the local stub server: retries, Retry-After, timeouts and the retry budget."""
+import time
+
+import pytest
+
+from anime_recs.jikan import JikanClient, JikanError, TokenBucket
+from anime_recs.jikan_stub import MISSING_FROM, StubJikan
+
+
+@pytest.fixture
+def stub():
+    with StubJikan() as server:
+        yield server
+
+
+def make_client(stub, **kwargs):
+    # Limits high enough that the token buckets never add waits of their own
+    options = dict(per_second=1000, per_minute=60000, timeout=2, max_retries=3, backoff_base=0.01, backoff_cap=1.0)
+    options.update(kwargs)
+    return JikanClient(stub.url, **options)
+
+
+def test_lookup_by_id_and_title(stub):
+    client = make_client(stub)
+    description, image = client.get_description(21)
+    assert description == "Synopsis of 21."
+    assert image.endswith("/21.jpg")
+    assert client.search_description("Cowboy Bebop")[0] == "Synopsis of Cowboy Bebop."
+    assert client.get_description(MISSING_FROM) is None
+
+
+def test_429_honours_retry_after(stub):
+    stub.retry_after = 0.2
+    stub.script.extend([429, 429])
+    client = make_client(stub)
+
+    assert client.get_description(1)[0] == "Synopsis of 1."
+    times = [t for t, _ in stub.requests]
+    assert len(times) == 3
+    assert all(later - earlier >= 0.19 for earlier, later in zip(times, times[1:]))
+
+
+def test_retry_budget_runs_out_without_a_final_sleep(stub):
+    stub.retry_after = 0.2
+    stub.script.extend([429] * 10)
+    client = make_client(stub, max_retries=2)
+
+    started = time.monotonic()
+    with pytest.raises(JikanError, match="HTTP 429"):
+        client.get_description(1)
+    elapsed = time.monotonic() - started
+    assert len(stub.requests) == 3
+    # Two waits between three attempts; none after the last one
+    assert 0.38 <= elapsed < 0.55
+
+
+def test_timeouts_are_retried_then_raised(stub):
+    stub.latency = 0.3
+    client = make_client(stub, timeout=0.05, max_retries=1, backoff_cap=0.01)
+
+    started = time.monotonic()
+    with pytest.raises(JikanError):
+        client.get_description(1)
+    assert time.monotonic() - started < 0.25
+    time.sleep(0.35)     # let the stub finish answering the abandoned requests
+    assert len(stub.requests) == 2
+
+
+def test_server_errors_are_retried_and_client_errors_are_not(stub):
+    stub.script.extend([503, 500])
+    client = make_client(stub)
+    assert client.get_description(3)[0] == "Synopsis of 3."
+    assert len(stub.requests) == 3
+
+    stub.script.append(400)
+    with pytest.raises(JikanError, match="HTTP 400"):
+        client.get_description(4)
+    assert len(stub.requests) == 4
+
+
+def test_invalid_json_raises_jikan_error(stub):
+    stub.script.append("bad_json")
+    with pytest.raises(JikanError, match="invalid JSON"):
+        make_client(stub).get_description(5)
+
+
+def test_fetch_many_keeps_order_and_returns_errors(stub):
+    stub.latency = 0.05
+    client = make_client(stub, max_retries=0)
+    stub.script.append(400)
+    results = client.fetch_many([10, 11, 12, 13], lookup=client.get_description, max_workers=1)
+    assert isinstance(results[0], JikanError)
+    assert [r[0] for r in results[1:]] == ["Synopsis of 11.", "Synopsis of 12.", "Synopsis of 13."]
+
+
+def test_rate_limit_spaces_requests(stub):
+    client = make_client(stub, per_second=5, per_minute=60000)
+    started = time.monotonic()
+    client.fetch_many(range(1, 11), lookup=client.get_description)
+    # 5 banked tokens, then one every 0.2 s
+    assert time.monotonic() - started >= 0.95
+
+
+def test_background_requests_leave_a_reserve_for_foreground():
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket._reserve(reserve=1) == (0.0, True)      # 2 -> 1
+    wait, taken = bucket._reserve(reserve=1)               # would leave 0 < 1
+    assert not taken and wait > 0.9
+    assert bucket._reserve() == (0.0, True)                # foreground still gets the last token
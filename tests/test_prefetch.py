@@ -0,0 +1,71 @@
+"""Prefetcher: what it stores in the synopsis cache, and how it counts lookups."""
+import pytest
+
+from anime_recs.jikan import JikanError
+from anime_recs.prefetch import Prefetcher, slide_order
+from anime_recs.synopsis_cache import SynopsisCache, id_key
+
+
+class FakeClient:
+    """get_description answers from a dict; missing ids are "not found", JikanError values are raised."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def get_description(self, anime_id, background=False):
+        self.calls.append((anime_id, background))
+        answer = self.answers.get(anime_id)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SynopsisCache(str(tmp_path / "synopses.sqlite3"))
+
+
+def test_prefetch_stores_only_found_synopses(cache):
+    client = FakeClient({1: ("one", "1.jpg"), 2: JikanError("HTTP 429 for /anime/2")})
+    prefetcher = Prefetcher(cache, client, max_workers=1)
+    prefetcher.schedule([1, 2, 3])
+    prefetcher.join()
+
+    assert cache.get(id_key(1)) == (True, "one", "1.jpg")
+    # A 429 or a "not found" must not shadow the page's own lookup
+    assert cache.get(id_key(2)) is None
+    assert cache.get(id_key(3)) is None
+    assert prefetcher.counters["fetched"] == 1 and prefetcher.counters["failed"] == 2
+    assert all(background for _, background in client.calls)
+
+    ok, description, _ = cache.get_or_fetch(id_key(2), lambda: ("two", ""))
+    assert (ok, description) == (True, "two")
+
+
+def test_prefetch_lookups_are_counted_once_and_apart(cache):
+    cache.put(id_key(1), "one", "")
+    prefetcher = Prefetcher(cache, FakeClient({2: ("two", "")}), max_workers=1)
+    prefetcher.schedule([1, 2])
+    prefetcher.join()
+
+    stats = cache.stats()
+    assert (stats["prefetch_hits"], stats["prefetch_misses"]) == (1, 1)
+    assert (stats["hits"], stats["misses"]) == (0, 0)
+    assert prefetcher.counters["already_cached"] == 1
+
+
+def test_full_queue_makes_room_for_the_newest_generation(cache):
+    prefetcher = Prefetcher(cache, FakeClient({}), max_workers=0, max_pending=4)
+    prefetcher.schedule([1, 2, 3, 4])
+    prefetcher.schedule([5, 6])              # the new visible slide
+    prefetcher.schedule([2])                 # queued again: moves up
+    prefetcher.schedule([7])
+
+    order = [anime_id for _, _, anime_id, _ in sorted(prefetcher._queued.values())]
+    assert order == [7, 2, 5, 6]
+    assert prefetcher.counters["dropped"] == 3
+
+
+def test_slide_order_starts_at_the_visible_slides():
+    assert slide_order([[1, 2, 3, 4], [5, 6, 7, 8]], [1, 0], 2) == [3, 4, 5, 6, 1, 2, 7, 8]
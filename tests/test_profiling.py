@@ -0,0 +1,60 @@
+"""A rerun profile steps aside when another profiler is already running."""
+import cProfile
+import threading
+import time
+
+from anime_recs import profiling
+
+
+def test_start_gives_way_to_a_running_profiler(monkeypatch):
+    def busy(self):
+        raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "all")
+    monkeypatch.setattr(cProfile.Profile, "enable", busy)
+    profile = profiling.profile_rerun("test")
+    assert profile is profiling._NO_PROFILE
+    assert profile.stop() is None
+    assert not profiling._active
+
+
+class StopRerun(Exception):
+    """Stands in for the StopException st.stop() raises."""
+
+
+def test_rerun_stopped_early_on_its_own_thread_writes_its_profile(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "all")
+    monkeypatch.setattr(profiling.RerunProfile.__init__, "__defaults__", (str(tmp_path), 20))
+    samplers = []
+
+    def rerun():
+        try:
+            with profiling.profile_rerun("page") as profile:
+                samplers.append(profile.sampler._thread)
+                time.sleep(0.01)     # profiles are named to the millisecond
+                raise StopRerun
+        except StopRerun:
+            pass
+
+    for _ in range(3):
+        thread = threading.Thread(target=rerun)
+        thread.start()
+        thread.join()
+
+    assert not profiling._active
+    assert not any(sampler.is_alive() for sampler in samplers)
+    assert len(list(tmp_path.glob("*-page-interrupted.pstats"))) == 3
+
+
+def test_profile_left_running_by_a_finished_thread_is_swept(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "all")
+    monkeypatch.setattr(profiling.RerunProfile.__init__, "__defaults__", (str(tmp_path), 20))
+    thread = threading.Thread(target=profiling.profile_rerun, args=("page",))
+    thread.start()
+    thread.join()
+    leftover = next(iter(profiling._active.values()))
+
+    profiling.profile_rerun("other").stop()
+    assert not profiling._active
+    assert not leftover.sampler._thread.is_alive()
+    assert list(tmp_path.glob("*-page-interrupted.folded"))
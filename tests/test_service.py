@@ -0,0 +1,72 @@
+"""The JSON service: input validation answers 400 and unexpected errors a JSON 500."""
+import http.client
+import json
+import threading
+
+import pytest
+
+from anime_recs import engine, service
+from anime_recs.data import load_catalog
+from anime_recs.synthetic import write_synthetic_catalog
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("service")
+    write_synthetic_catalog(tmp / "meta.csv", tmp / "recs.json", 300, neighbours=20)
+    catalog = load_catalog(str(tmp / "meta.csv"), str(tmp / "recs.json"), cache_dir=str(tmp / "cache"))
+    server = service.make_server(catalog, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def call(server, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    conn.request(method, path, None if body is None else json.dumps(body), {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    payload = json.loads(response.read())
+    conn.close()
+    return response.status, payload
+
+
+def test_valid_requests(server):
+    anime_id = int(server.catalog.anime_df["anime_id"].iloc[0])
+    status, payload = call(server, "GET", f"/recommend?anime_id={anime_id}&lists=hybrid&include=Action")
+    assert status == 200 and payload["anime_id"] == anime_id and "hybrid" in payload
+    status, payload = call(server, "POST", "/recommend/batch", {"anime_ids": [anime_id, -1], "lists": ["user"]})
+    assert status == 200
+    assert payload["results"][1] == {"anime_id": -1, "error": "unknown anime_id"}
+
+
+@pytest.mark.parametrize("body", [
+    {"anime_ids": "123"},
+    {"anime_ids": 5},
+    {"anime_ids": [1.5]},
+    {"anime_ids": [True]},
+    {"anime_ids": ["7"]},
+    {"anime_ids": [1], "include": "Action"},
+    {"anime_ids": [1], "exclude": [3]},
+    {"anime_ids": [1], "lists": "hybrid"},
+])
+@pytest.mark.parametrize("path", ["/recommend/batch", "/recommend/seeds"])
+def test_malformed_bodies_are_rejected(server, path, body):
+    status, payload = call(server, "POST", path, body)
+    assert status == 400 and "must be" in payload["error"]
+
+
+def test_malformed_query(server):
+    assert call(server, "GET", "/recommend?anime_id=abc")[0] == 400
+    assert call(server, "GET", "/recommend")[0] == 400
+
+
+def test_unexpected_errors_answer_500(server, monkeypatch, capsys):
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(engine, "recommend", broken)
+    status, payload = call(server, "POST", "/recommend/batch", {"anime_ids": [1]})
+    assert status == 500 and payload == {"error": "internal server error"}
+    assert "RuntimeError: boom" in capsys.readouterr().err
+    assert call(server, "GET", "/health")[0] == 200
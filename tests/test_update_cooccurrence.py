@@ -0,0 +1,87 @@
+"""update_cooccurrence against a full rebuild on the merged ratings, for every similarity."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("scipy")
+
+from anime_recs import build_cooccurrence, recs_graph, update_cooccurrence
+from anime_recs.synthetic import synthetic_ratings
+
+TOP_K = 8
+
+
+def quiet(*args):
+    pass
+
+
+@pytest.fixture(scope="module")
+def ratings():
+    ratings = pd.concat(synthetic_ratings(400, 50, ratings_per_user=12, n_clusters=4, seed=5, chunk_users=100))
+    base = ratings.iloc[:4000]
+    # New users, new anime, changed and withdrawn likes
+    first = pd.concat([ratings.iloc[4000:4400],
+                       pd.DataFrame({"user_id": [10_001, 10_001], "anime_id": [9_000, 1], "rating": [9, 9]}),
+                       base.sample(150, random_state=1).assign(rating=2)])
+    second = pd.concat([ratings.iloc[4400:], base.sample(150, random_state=2).assign(rating=9)])
+    return base, [first, second]
+
+
+def rows(graph):
+    seeds = graph.seed_ids().tolist()
+    return {a: (graph.neighbours_of(a).tolist(), graph.weights_of(a)) for a in seeds}
+
+
+@pytest.mark.parametrize("similarity", build_cooccurrence.SIMILARITIES)
+def test_updates_match_a_full_rebuild(ratings, tmp_path, similarity):
+    base, deltas = ratings
+    options = dict(similarity=similarity, top_k=TOP_K, workers=1, log=quiet)
+    base.to_csv(tmp_path / "base.csv", index=False)
+    build_cooccurrence.build(str(tmp_path / "base.csv"), str(tmp_path / "recs.json"),
+                             state_dir=str(tmp_path / "state"), **options)
+
+    merged = base
+    for i, delta in enumerate(deltas):
+        delta.to_csv(tmp_path / f"delta{i}.csv", index=False)
+        graph = update_cooccurrence.update(str(tmp_path / "state"), str(tmp_path / f"delta{i}.csv"),
+                                           str(tmp_path / "recs.json"), csr_path=str(tmp_path / "recs.csr"),
+                                           log=quiet)
+        merged = pd.concat([merged, delta]).drop_duplicates(["user_id", "anime_id"], keep="last")
+        merged.to_csv(tmp_path / "merged.csv", index=False)
+        neighbours, weights = build_cooccurrence.build(str(tmp_path / "merged.csv"), str(tmp_path / "full.json"),
+                                                       **options)
+
+        updated = rows(graph)
+        assert set(updated) == set(neighbours)
+        for anime_id, (ids, row_weights) in updated.items():
+            assert row_weights == pytest.approx(weights[anime_id], rel=1e-5, abs=1e-6)
+            if similarity == "count":
+                assert ids == neighbours[anime_id]
+        with open(tmp_path / "recs.json", encoding="utf-8") as f:
+            assert json.load(f) == {str(a): ids for a, (ids, _) in updated.items()}
+        saved = rows(recs_graph.load(str(tmp_path / "recs.csr")))
+        assert all(saved[a][0] == updated[a][0] for a in updated)
+
+
+def test_replace_rows_grows_and_replaces_rows():
+    indptr = np.array([0, 2, 3, 5])
+    values = np.array([10, 11, 20, 30, 31])
+    new_indptr, (new_values,) = update_cooccurrence._replace_rows(
+        5, np.array([1, 4]), indptr, (values,), np.array([0, 0, 2]), (np.array([40, 41]),))
+    assert new_indptr.tolist() == [0, 2, 2, 4, 4, 6]
+    assert new_values.tolist() == [10, 11, 30, 31, 40, 41]
+
+
+def test_update_leaves_the_state_memory_mapped(ratings, tmp_path):
+    base, (delta, _) = ratings
+    base.to_csv(tmp_path / "base.csv", index=False)
+    delta.to_csv(tmp_path / "delta.csv", index=False)
+    build_cooccurrence.build(str(tmp_path / "base.csv"), str(tmp_path / "recs.json"), top_k=TOP_K, workers=1,
+                             state_dir=str(tmp_path / "state"), log=quiet)
+    update_cooccurrence.update(str(tmp_path / "state"), str(tmp_path / "delta.csv"), str(tmp_path / "recs.json"),
+                               log=quiet)
+    state = update_cooccurrence.load_state(str(tmp_path / "state"))
+    assert all(isinstance(state[name], np.memmap) for name in update_cooccurrence.STATE_ARRAYS)
+    assert not [p.name for p in (tmp_path / "state").iterdir() if p.name.startswith(".")]    # nothing left staged